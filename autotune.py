@@ -0,0 +1,57 @@
+from __future__ import annotations
+import time
+import numpy as np
+from geo_structures import RectangleArea, Point
+from kd_tree import KdTree
+from quadtree import Quadtree
+
+LEAF_SIZES = (4, 8, 16, 32, 64, 128, 256)
+MAX_POINTS_PER_NODE = (1, 2, 4, 8, 16, 32, 64)
+
+
+def query_latency(tree, rectangles: list[RectangleArea], repeats: int) -> float:
+    # Średni czas find na prostokąt. Z kilku przebiegów bierzemy najszybszy (najmniej
+    # zakłóceń), a pierwszy, rozgrzewający, nie jest liczony
+    for rectangle in rectangles:
+        tree.find(rectangle)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for rectangle in rectangles:
+            tree.find(rectangle)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rectangles)
+
+
+def tune(build, candidates, rectangles: list[RectangleArea], repeats: int) -> tuple[int, dict]:
+    # Buduje drzewo dla każdej wartości parametru i zwraca tę z najmniejszym czasem zapytań
+    # oraz czasy wszystkich kandydatów (sekundy na zapytanie)
+    if not rectangles:
+        raise ValueError("At least one query rectangle is needed")
+    latencies = {c: query_latency(build(c), rectangles, repeats) for c in candidates}
+    return min(latencies, key=latencies.get), latencies
+
+
+def tune_leaf_size(
+    points: list[Point] | np.ndarray,
+    rectangles: list[RectangleArea],
+    candidates=LEAF_SIZES,
+    repeats: int = 3,
+) -> tuple[int, dict]:
+    # Rozmiar kubełka KdTree dla próbki punktów (lista albo tablica (n, K)) i typowych zapytań
+    return tune(lambda c: KdTree(points, leaf_size=c), candidates, rectangles, repeats)
+
+
+def tune_max_points_per_node(
+    points: list[Point] | np.ndarray,
+    rectangles: list[RectangleArea],
+    candidates=MAX_POINTS_PER_NODE,
+    repeats: int = 3,
+    vectorized: bool = False,
+) -> tuple[int, dict]:
+    # max_points_per_node Quadtree; tablicę (n, 2) budujemy przez from_arrays
+    if isinstance(points, np.ndarray):
+        build = lambda c: Quadtree.from_arrays(points[:, 0], points[:, 1], max_points_per_node=c)
+    else:
+        build = lambda c: Quadtree(points, c, vectorized=vectorized)
+    return tune(build, candidates, rectangles, repeats)
@@ -0,0 +1,328 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from geo_structures import RectangleArea, Point
+from kd_tree import KdTree
+from quadtree import Quadtree
+from quadtree_morton import MortonQuadtree
+
+# Powtarzalne pomiary KdTree i Quadtree:
+#   python benchmark.py --sizes 10000 50000 --output results.json
+#   python benchmark.py --output new.json --baseline results.json
+# Każdy pomiar to rozkład danych x liczba punktów x struktura x operacja. Budowę mierzymy
+# repeats razy (po warmup przebiegach rozgrzewających), a zapytania jako czasy pojedynczych
+# wywołań find dla prostokątów o zadanej selektywności (części pola obszaru z punktami).
+# Pamięć szczytowa budowy pochodzi z tracemalloc, z osobnego przebiegu, bo śledzenie
+# alokacji spowalnia program
+
+EXTENT = 5000  # punkty leżą w kwadracie [0, EXTENT] x [0, EXTENT], jak w dawnym times.py
+
+
+def uniform_points(n: int, rng: np.random.Generator) -> np.ndarray:
+    return rng.uniform(0, EXTENT, (n, 2))
+
+
+def normal_points(n: int, rng: np.random.Generator) -> np.ndarray:
+    return rng.normal(EXTENT / 2, 650, (n, 2))
+
+
+def clusters_points(n: int, rng: np.random.Generator) -> np.ndarray:
+    # Pięć prostokątnych skupisk (min_x, min_y, max_x, max_y), punkty rozdzielone po równo
+    clusters = np.array(
+        [
+            (1000, 1000, 1400, 1600),
+            (3000, 3000, 3500, 3500),
+            (4000, 0, 4500, 500),
+            (500, 4000, 1000, 4500),
+            (2500, 2000, 3000, 2500),
+        ],
+        dtype=np.float64,
+    )
+    chosen = clusters[np.arange(n) % len(clusters)]
+    return rng.uniform(chosen[:, :2], chosen[:, 2:])
+
+
+DISTRIBUTIONS = {
+    "uniform": uniform_points,
+    "normal": normal_points,
+    "clusters": clusters_points,
+}
+
+# Budowa struktury z tablicy (n, 2) i listy tych samych punktów
+STRUCTURES = {
+    "kd": lambda coords, points: KdTree(points),
+    "kd_presort": lambda coords, points: KdTree(points, method="presort"),
+    "kd_arrays": lambda coords, points: KdTree.from_arrays(coords[:, 0], coords[:, 1]),
+    "kd_partition": lambda coords, points: KdTree(coords, method="partition"),
+    "quad": lambda coords, points: Quadtree(points),
+    "quad_vectorized": lambda coords, points: Quadtree(points, vectorized=True),
+    "morton": lambda coords, points: MortonQuadtree(coords),
+}
+
+
+def query_rectangles(
+    coords: np.ndarray, selectivity: float, count: int, rng: np.random.Generator
+) -> list[RectangleArea]:
+    # Kwadraty o polu selectivity * pole prostokąta ograniczającego, losowo położone w jego wnętrzu
+    min_x, min_y = coords.min(axis=0).tolist()
+    max_x, max_y = coords.max(axis=0).tolist()
+    width = (max_x - min_x) * selectivity**0.5
+    height = (max_y - min_y) * selectivity**0.5
+    xs = rng.uniform(min_x, max_x - width, count).tolist()
+    ys = rng.uniform(min_y, max_y - height, count).tolist()
+    return [RectangleArea(x, y, x + width, y + height) for x, y in zip(xs, ys)]
+
+
+def summarize(samples: list[float]) -> dict:
+    values = np.array(samples, dtype=np.float64)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]).tolist()
+    return {
+        "samples": len(values),
+        "min": float(values.min()),
+        "mean": float(values.mean()),
+        "p50": p50,
+        "p90": p90,
+        "p99": p99,
+        "max": float(values.max()),
+    }
+
+
+def measure_build(build, coords, points, repeats: int, warmup: int) -> tuple[dict, object]:
+    for _ in range(warmup):
+        build(coords, points)
+    samples = []
+    tree = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        tree = build(coords, points)
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    build(coords, points)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    res = summarize(samples)
+    res["peak_memory_bytes"] = peak
+    return res, tree
+
+
+def measure_queries(tree, rectangles, repeats: int, warmup: int) -> tuple[dict, list[int]]:
+    for rectangle in rectangles[:warmup]:
+        tree.find(rectangle)
+    samples = []
+    counts = []
+    for _ in range(repeats):
+        counts = []
+        for rectangle in rectangles:
+            start = time.perf_counter()
+            found = tree.find(rectangle)
+            samples.append(time.perf_counter() - start)
+            counts.append(len(found))
+    res = summarize(samples)
+    res["mean_result_size"] = float(np.mean(counts)) if counts else 0.0
+    return res, counts
+
+
+def run(args) -> dict:
+    results = measure_imports(args.imports, args.repeats)
+    for distribution in args.distributions:
+        for n in args.sizes:
+            rng = np.random.default_rng([args.seed, n, sorted(DISTRIBUTIONS).index(distribution)])
+            coords = DISTRIBUTIONS[distribution](n, rng)
+            points = [Point(x, y) for x, y in coords.tolist()]
+            queries = {
+                s: query_rectangles(coords, s, args.queries, rng) for s in args.selectivities
+            }
+
+            expected = {}  # liczby wyników z pierwszej struktury, do sprawdzenia pozostałych
+            for structure in args.structures:
+                build = STRUCTURES[structure]
+                stats, tree = measure_build(build, coords, points, args.repeats, args.warmup)
+                if hasattr(tree, "describe"):  # kształt drzewa, żeby wyjaśniać zmiany czasów
+                    shape = tree.describe()
+                    stats["tree"] = {
+                        key: shape[key]
+                        for key in ("nodes", "leaves", "height", "empty_leaf_ratio")
+                    }
+                    stats["tree"]["memory_bytes"] = shape["memory"]["total"]
+                results.append(
+                    {
+                        "distribution": distribution,
+                        "n": n,
+                        "structure": structure,
+                        "operation": "build",
+                        "selectivity": None,
+                        **stats,
+                    }
+                )
+                print(f"{distribution:>9} {n:>8} {structure:>16} build  p50 {stats['p50']:.4f} s")
+
+                for selectivity, rectangles in queries.items():
+                    stats, counts = measure_queries(tree, rectangles, args.repeats, args.warmup)
+                    if expected.setdefault(selectivity, counts) != counts:
+                        raise AssertionError(
+                            f"{structure} returned different results than {args.structures[0]}"
+                        )
+                    results.append(
+                        {
+                            "distribution": distribution,
+                            "n": n,
+                            "structure": structure,
+                            "operation": "find",
+                            "selectivity": selectivity,
+                            **stats,
+                        }
+                    )
+                    print(
+                        f"{distribution:>9} {n:>8} {structure:>16} find   "
+                        f"selectivity {selectivity:<8} p50 {stats['p50'] * 1e6:.1f} us"
+                    )
+
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "warmup": args.warmup,
+            "queries": args.queries,
+        },
+        "results": results,
+    }
+
+
+CORE_MODULES = ["geo_structures", "get_median", "kd_tree", "quadtree"]
+PLOTTING_MODULES = ["matplotlib", "IPython", "visualizer"]
+
+# Mierzone w nowym interpreterze, żeby żaden moduł nie był już załadowany
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, sorted(m for m in {plotting} if m in sys.modules)]))
+"""
+
+
+def measure_imports(modules: list[str], repeats: int) -> list[dict]:
+    # Czas zimnego importu modułów rdzenia i sprawdzenie, że nie ciągną bibliotek do rysowania
+    results = []
+    for module in modules:
+        samples = []
+        loaded = []
+        for _ in range(repeats):
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    IMPORT_SCRIPT.format(module=module, plotting=PLOTTING_MODULES),
+                ],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            elapsed, loaded = json.loads(out.stdout)
+            samples.append(elapsed)
+        stats = summarize(samples)
+        results.append(
+            {
+                "distribution": None,
+                "n": None,
+                "structure": module,
+                "operation": "import",
+                "selectivity": None,
+                **stats,
+                "plotting_modules": loaded,
+            }
+        )
+        print(f"{module:>16} import p50 {stats['p50'] * 1e3:.1f} ms")
+    return results
+
+
+def result_key(result: dict) -> tuple:
+    return (
+        result["distribution"],
+        result["n"],
+        result["structure"],
+        result["operation"],
+        result["selectivity"],
+    )
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    # Regresja to mediana czasu większa od mediany z wyników bazowych o więcej niż tolerance
+    reference = {result_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = reference.get(result_key(result))
+        if old is None:
+            continue
+        ratio = result["p50"] / old["p50"] if old["p50"] > 0 else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{' '.join(str(v) for v in result_key(result) if v is not None)}: "
+                f"p50 {old['p50']:.6f} s -> {result['p50']:.6f} s ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark KdTree and Quadtree")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000])
+    parser.add_argument(
+        "--distributions", nargs="+", choices=sorted(DISTRIBUTIONS), default=sorted(DISTRIBUTIONS)
+    )
+    parser.add_argument(
+        "--structures", nargs="+", choices=list(STRUCTURES), default=["kd", "quad"]
+    )
+    parser.add_argument(
+        "--selectivities", type=float, nargs="+", default=[0.0001, 0.001, 0.01, 0.1]
+    )
+    parser.add_argument("--queries", type=int, default=100, help="rectangles per selectivity")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--imports", nargs="*", default=CORE_MODULES, help="modules whose cold import is timed"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed p50 slowdown vs the baseline"
+    )
+    args = parser.parse_args(argv)
+
+    current = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    status = 0
+    for result in current["results"]:
+        if result.get("plotting_modules"):
+            print("IMPORT", result["structure"], "loads", ", ".join(result["plotting_modules"]))
+            status = 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
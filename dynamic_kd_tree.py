@@ -0,0 +1,104 @@
+from __future__ import annotations
+from collections import Counter
+from kd_tree import KdTree
+from geo_structures import RectangleArea, Point
+
+
+class DynamicKdTree:
+    def __init__(self, points: list[Point] | None = None):
+        # Las statycznych KdTree (metoda logarytmiczna Bentleya-Saxe'a):
+        # poziom i zawiera drzewo z dokładnie 2^i punktami albo None
+        self.levels: list[KdTree | None] = []
+        self.deleted = Counter()  # punkty usunięte leniwie, wciąż obecne w drzewach
+        self.deleted_count = 0
+        self.size = 0  # liczba żywych punktów
+        self.version = 0  # zwiększana przy każdej zmianie punktów (insert/remove)
+
+        if points:
+            self.rebuild(list(points))
+
+    def rebuild(self, points: list[Point]) -> None:
+        # Rozkładamy punkty na drzewa według zapisu binarnego ich liczby
+        self.levels = []
+        self.deleted = Counter()
+        self.deleted_count = 0
+        self.size = len(points)
+
+        start = 0
+        i = 0
+        while len(points) >> i:
+            if (len(points) >> i) & 1:
+                self.levels.append(KdTree(points[start : start + (1 << i)]))
+                start += 1 << i
+            else:
+                self.levels.append(None)
+            i += 1
+
+    def live_points(self) -> list[Point]:
+        res = []
+        pending = Counter(self.deleted)
+        for tree in self.levels:
+            if tree is None:
+                continue
+            for point in tree.points:
+                if pending[point] > 0:  # pomijamy punkty usunięte
+                    pending[point] -= 1
+                else:
+                    res.append(point)
+        return res
+
+    def insert(self, point: Point) -> None:
+        # Jak dodawanie jedynki w systemie binarnym: scalamy kolejne pełne poziomy
+        # w jedno drzewo o rozmiarze kolejnej potęgi dwójki
+        self.version += 1
+        carry = [point]
+        i = 0
+        while i < len(self.levels) and self.levels[i] is not None:
+            carry.extend(self.levels[i].points)
+            self.levels[i] = None
+            i += 1
+        if i == len(self.levels):
+            self.levels.append(None)
+        self.levels[i] = KdTree(carry)
+        self.size += 1
+
+    def remove(self, point: Point) -> None:
+        # Usuwamy leniwie: punkt zostaje w drzewie, ale jest pomijany w wynikach
+        stored = sum(
+            len(tree.find(RectangleArea(point.x, point.y, point.x, point.y)))
+            for tree in self.levels
+            if tree is not None
+        )
+        if stored - self.deleted[point] <= 0:
+            raise ValueError(f"{point} is not in the kd-tree")
+        self.version += 1
+
+        self.deleted[point] += 1
+        self.deleted_count += 1
+        self.size -= 1
+
+        # Gdy usunięte stanowią ponad połowę, przebudowujemy las z żywych punktów
+        if self.deleted_count > self.size:
+            self.rebuild(self.live_points())
+
+    def move(self, old: Point, new: Point) -> None:
+        self.remove(old)
+        self.insert(new)
+
+    def find(self, rectangle: RectangleArea) -> list[Point]:
+        res = []
+        for tree in self.levels:
+            if tree is not None:
+                res.extend(tree.find(rectangle))
+
+        if not self.deleted_count:
+            return res
+
+        pending = Counter(self.deleted)
+        filtered = []
+        for point in res:
+            if pending[point] > 0:
+                pending[point] -= 1
+            else:
+                filtered.append(point)
+        return filtered
@@ -0,0 +1,196 @@
+from __future__ import annotations
+import json
+import os
+import numpy as np
+from geo_structures import RectangleArea, Point
+
+# Drzewo zapisane na dysku to katalog z płaskimi tablicami .npy:
+#   bounds (m, 4)       - prostokąt węzła: min_x, min_y, max_x, max_y
+#   children (m, c)     - numery dzieci węzła (-1 gdy brak), c = 2 dla KdTree, 4 dla Quadtree
+#   point_range (m, 2)  - węzeł obejmuje punkty xs[start:end], ys[start:end]
+#   xs, ys (n,)         - współrzędne punktów w kolejności liści
+# oraz opcjonalnie, w tej samej kolejności:
+#   ids (n,)            - identyfikatory punktów (drzewa z from_arrays(..., ids=...))
+#   indices (n,)        - numery punktów na wejściu budowy (KdTree.indices)
+# i plik meta.json z rodzajem drzewa, rozmiarami i listą zapisanych tablic opcjonalnych.
+# Węzły są numerowane w preorder, korzeń ma numer 0.
+FORMAT_VERSION = 1
+ARRAYS = ("bounds", "children", "point_range", "xs", "ys")
+OPTIONAL_ARRAYS = ("ids", "indices")
+
+
+def save_tree(
+    path: str,
+    kind: str,
+    root,
+    children_of,
+    leaf_points_of,
+    count_of,
+    leaf_ids_of=None,
+    leaf_indices_of=None,
+) -> None:
+    # leaf_ids_of / leaf_indices_of zwracają tablicę identyfikatorów / numerów punktów liścia
+    # albo None; wtedy (np. liść zmieniony przez insert) cała tablica nie jest zapisywana
+    bounds = []
+    children = []
+    point_range = []
+    xs = []
+    ys = []
+    optional = {
+        name: ([], of)
+        for name, of in (("ids", leaf_ids_of), ("indices", leaf_indices_of))
+        if of is not None
+    }
+
+    stack = [(root, -1, 0)] if root is not None else []  # (węzeł, numer rodzica, numer dziecka)
+    while stack:
+        node, parent, slot = stack.pop()
+        number = len(bounds)
+        if parent >= 0:
+            children[parent][slot] = number
+
+        bounds.append(node.rectangle.get_extrema())
+        start = len(xs)  # w preorder liście poddrzewa są dopisywane zaraz po węźle
+        point_range.append((start, start + count_of(node)))
+
+        node_children = children_of(node)
+        children.append([-1] * width_of(kind))
+        if node_children:
+            for i in reversed(range(len(node_children))):
+                stack.append((node_children[i], number, i))
+        else:
+            for p in leaf_points_of(node):
+                xs.append(p.x)
+                ys.append(p.y)
+            for name in list(optional):
+                parts, of = optional[name]
+                values = of(node) if count_of(node) else ()
+                if values is None:
+                    del optional[name]
+                else:
+                    parts.append(np.asarray(values))
+
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        "bounds": np.array(bounds, dtype=np.float64).reshape(-1, 4),
+        "children": np.array(children, dtype=np.int64).reshape(-1, width_of(kind)),
+        "point_range": np.array(point_range, dtype=np.int64).reshape(-1, 2),
+        "xs": np.array(xs, dtype=np.float64),
+        "ys": np.array(ys, dtype=np.float64),
+    }
+    for name, (parts, _) in optional.items():
+        array = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        if array.dtype == object:  # tablic obiektów nie da się zmapować z dysku
+            array = array.astype(str)
+        arrays[name] = array
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + ".npy"), array)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(
+            {
+                "format_version": FORMAT_VERSION,
+                "kind": kind,
+                "nodes": len(bounds),
+                "size": len(xs),
+                "optional": list(optional),
+            },
+            f,
+        )
+
+
+def width_of(kind: str) -> int:
+    return 2 if kind == "kd_tree" else 4
+
+
+class FlatTree:
+    def __init__(self, path: str, kind: str | None = None):
+        # Tablice są mapowane z dysku (np.memmap), więc wczytanie nie zależy od rozmiaru drzewa,
+        # a wiele procesów korzysta z tej samej kopii w pamięci podręcznej systemu
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported tree format version: {meta['format_version']}")
+        if kind is not None and meta["kind"] != kind:
+            raise ValueError(f"{path} contains a {meta['kind']}, not a {kind}")
+
+        self.kind = meta["kind"]
+        self.size = meta["size"]
+        self.nodes = meta["nodes"]
+        for name in ARRAYS:
+            file = os.path.join(path, name + ".npy")
+            # Pustego pliku nie da się zmapować, ale też nie ma czego czytać
+            length = self.size if name in ("xs", "ys") else self.nodes
+            setattr(self, name, np.load(file, mmap_mode="r" if length else None))
+        # Tablice opcjonalne (brak w plikach zapisanych bez nich)
+        for name in OPTIONAL_ARRAYS:
+            array = None
+            if name in meta.get("optional", []):
+                file = os.path.join(path, name + ".npy")
+                array = np.load(file, mmap_mode="r" if self.size else None)
+            setattr(self, name, array)
+
+    def visit(self, rectangle: RectangleArea) -> list[tuple[int, int, np.ndarray | None]]:
+        # Zwraca przedziały punktów: (start, end, None) gdy cały przedział leży w prostokącie,
+        # albo (start, end, pozycje) dla liści sprawdzonych maską
+        res = []
+        min_x, min_y, max_x, max_y = rectangle.get_extrema()
+        stack = [0] if self.nodes > 0 else []
+        while stack:
+            node = stack.pop()
+            n_min_x, n_min_y, n_max_x, n_max_y = self.bounds[node].tolist()
+            if n_min_x > max_x or min_x > n_max_x or n_min_y > max_y or min_y > n_max_y:
+                continue  # prostokąty nie mają wspólnego obszaru
+
+            start, end = self.point_range[node].tolist()
+            if (
+                min_x <= n_min_x
+                and n_max_x <= max_x
+                and min_y <= n_min_y
+                and n_max_y <= max_y
+            ):  # cały węzeł w szukanym obszarze
+                res.append((start, end, None))
+                continue
+
+            children = self.children[node].tolist()
+            if children[0] < 0:  # liść - sprawdzamy punkty jedną maską
+                xs = self.xs[start:end]
+                ys = self.ys[start:end]
+                mask = (xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y)
+                res.append((start, end, start + np.flatnonzero(mask)))
+                continue
+
+            stack.extend(child for child in reversed(children) if child >= 0)
+        return res
+
+    def find_positions(self, rectangle: RectangleArea) -> np.ndarray:
+        parts = [
+            np.arange(start, end) if positions is None else positions
+            for start, end, positions in self.visit(rectangle)
+        ]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(parts)
+
+    def find_ids(self, rectangle: RectangleArea) -> np.ndarray:
+        if self.ids is None:
+            raise ValueError("The tree was saved without ids")
+        return np.asarray(self.ids[self.find_positions(rectangle)])
+
+    def find_indices(self, rectangle: RectangleArea) -> np.ndarray:
+        # Numery punktów na wejściu budowy zapisanego drzewa
+        if self.indices is None:
+            raise ValueError("The tree was saved without point indices")
+        return np.asarray(self.indices[self.find_positions(rectangle)])
+
+    def find(self, rectangle: RectangleArea) -> list[Point]:
+        positions = self.find_positions(rectangle)
+        return [
+            Point(x, y)
+            for x, y in zip(self.xs[positions].tolist(), self.ys[positions].tolist())
+        ]
+
+    def count(self, rectangle: RectangleArea) -> int:
+        return sum(
+            end - start if positions is None else len(positions)
+            for start, end, positions in self.visit(rectangle)
+        )
@@ -2,10 +2,23 @@ from __future__ import annotations
 
 
 class Point:
+    # Sloty zamiast __dict__ zmniejszają rozmiar każdego punktu. Punkt jest niezmienny,
+    # bo jego hash zależy od współrzędnych, a drzewa przechowują go w wielu miejscach
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
         # Punkt w dwuwymiarowej przestrzeni
-        self.x = x
-        self.y = y
+        set_point_x(self, x)
+        set_point_y(self, y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (Point, (self.x, self.y))
 
     def __str__(self):
         # Reprezentacja punktu jako tekst
@@ -17,6 +30,9 @@ class Point:
         else:
             return self.y
 
+    def distance_squared(self, other: Point) -> float:
+        return (self.x - other.x) ** 2 + (self.y - other.y) ** 2
+
     def __eq__(self, other):
         if isinstance(other, Point):
             return self.x == other.x and self.y == other.y
@@ -26,16 +42,98 @@ class Point:
         return hash((self.x, self.y))
 
 
+# Zapis do slotów z pominięciem zablokowanego __setattr__. Deskryptory slotów wołane wprost
+# są wyraźnie szybsze niż object.__setattr__(self, "x", x), a punkty powstają dla każdego
+# wyniku zapytania (PointArray, make_points)
+set_point_x = Point.x.__set__
+set_point_y = Point.y.__set__
+
+
 class RectangleArea:
+    __slots__ = ("min_x", "min_y", "max_x", "max_y")
+
     def __init__(self, min_x: float, min_y: float, max_x: float, max_y: float):
-        self.min_x = min_x
-        self.max_x = max_x
-        self.min_y = min_y
-        self.max_y = max_y
+        set_min_x(self, min_x)
+        set_max_x(self, max_x)
+        set_min_y(self, min_y)
+        set_max_y(self, max_y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (RectangleArea, self.get_extrema())
+
+    def __str__(self):
+        return f"RectangleArea({self.min_x}, {self.min_y}, {self.max_x}, {self.max_y})"
 
     def get_extrema(self):
         return (self.min_x, self.min_y, self.max_x, self.max_y)
 
+    def get_min(self, dim):
+        if dim == 0:
+            return self.min_x
+        else:
+            return self.min_y
+
+    def get_max(self, dim):
+        if dim == 0:
+            return self.max_x
+        else:
+            return self.max_y
+
+    def min_distance_squared(self, point: Point) -> float:
+        # Kwadrat odległości punktu od najbliższego punktu prostokąta (0 jeśli jest w środku)
+        dx = max(self.min_x - point.x, 0, point.x - self.max_x)
+        dy = max(self.min_y - point.y, 0, point.y - self.max_y)
+        return dx * dx + dy * dy
+
+    def max_distance_squared(self, point: Point) -> float:
+        # Kwadrat odległości punktu od najdalszego wierzchołka prostokąta
+        dx = max(point.x - self.min_x, self.max_x - point.x)
+        dy = max(point.y - self.min_y, self.max_y - point.y)
+        return dx * dx + dy * dy
+
+    def intersects(self, other: RectangleArea) -> bool:
+        # To samo co (self & other) is not None, ale bez tworzenia nowego prostokąta
+        return (
+            self.min_x <= other.max_x
+            and other.min_x <= self.max_x
+            and self.min_y <= other.max_y
+            and other.min_y <= self.max_y
+        )
+
+    def contains_point(self, x, y) -> bool:
+        return self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y
+
+    def contains(self, point: Point) -> bool:
+        # Wersja contains_point przyjmująca punkt, wspólna z BoxArea
+        return self.min_x <= point.x <= self.max_x and self.min_y <= point.y <= self.max_y
+
+    def contains_rect(self, other: RectangleArea) -> bool:
+        return (
+            self.min_x <= other.min_x
+            and other.max_x <= self.max_x
+            and self.min_y <= other.min_y
+            and other.max_y <= self.max_y
+        )
+
+    def split(self, dim: int, value: float) -> tuple[RectangleArea, RectangleArea]:
+        # Podział prostą prostopadłą do osi dim na część mniejszą i większą
+        if dim == 0:
+            return (
+                RectangleArea(self.min_x, self.min_y, value, self.max_y),
+                RectangleArea(value, self.min_y, self.max_x, self.max_y),
+            )
+        else:
+            return (
+                RectangleArea(self.min_x, self.min_y, self.max_x, value),
+                RectangleArea(self.min_x, value, self.max_x, self.max_y),
+            )
+
     def __eq__(self, other: RectangleArea) -> bool:
         if not isinstance(other, RectangleArea):
             return False
@@ -52,10 +150,148 @@ class RectangleArea:
             return None
 
     def __contains__(self, item: RectangleArea | Point) -> bool:
+        # Porównania wpisane wprost (jak w contains_rect i contains_point), bez dodatkowego wywołania
         if isinstance(item, RectangleArea):
-            return self & item == item
-        else:
             return (
-                self.min_x <= item.x <= self.max_x
-                and self.min_y <= item.y <= self.max_y
+                self.min_x <= item.min_x
+                and item.max_x <= self.max_x
+                and self.min_y <= item.min_y
+                and item.max_y <= self.max_y
             )
+        return self.min_x <= item.x <= self.max_x and self.min_y <= item.y <= self.max_y
+
+
+set_min_x = RectangleArea.min_x.__set__
+set_max_x = RectangleArea.max_x.__set__
+set_min_y = RectangleArea.min_y.__set__
+set_max_y = RectangleArea.max_y.__set__
+
+
+class PointND:
+    # Punkt w przestrzeni o dowolnej liczbie wymiarów (np. szerokość, długość, czas).
+    # Dla dwóch wymiarów drzewa używają zwykłego Point
+    __slots__ = ("coords",)
+
+    def __init__(self, coords):
+        object.__setattr__(self, "coords", tuple(coords))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (PointND, (self.coords,))
+
+    def __str__(self):
+        return f"PointND{self.coords}"
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __iter__(self):
+        return iter(self.coords)
+
+    def get(self, dim):
+        return self.coords[dim]
+
+    def distance_squared(self, other: PointND) -> float:
+        return sum((a - b) ** 2 for a, b in zip(self.coords, other.coords))
+
+    def __eq__(self, other):
+        if isinstance(other, PointND):
+            return self.coords == other.coords
+        return False
+
+    def __hash__(self):
+        return hash(self.coords)
+
+
+class BoxArea:
+    # Prostopadłościan w K wymiarach: mins[d] <= współrzędna d <= maxs[d].
+    # Ma te same metody co RectangleArea, więc KdTree obsługuje oba tak samo
+    __slots__ = ("mins", "maxs")
+
+    def __init__(self, mins, maxs):
+        if len(mins) != len(maxs):
+            raise ValueError("mins and maxs must have the same number of dimensions")
+        object.__setattr__(self, "mins", tuple(mins))
+        object.__setattr__(self, "maxs", tuple(maxs))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (BoxArea, (self.mins, self.maxs))
+
+    def __str__(self):
+        return f"BoxArea({self.mins}, {self.maxs})"
+
+    def get_extrema(self):
+        # Najpierw wszystkie minima, potem maksima - dla K = 2 tak samo jak w RectangleArea
+        return self.mins + self.maxs
+
+    def get_min(self, dim):
+        return self.mins[dim]
+
+    def get_max(self, dim):
+        return self.maxs[dim]
+
+    def min_distance_squared(self, point) -> float:
+        res = 0
+        for dim, (lo, hi) in enumerate(zip(self.mins, self.maxs)):
+            value = point.get(dim)
+            d = max(lo - value, 0, value - hi)
+            res += d * d
+        return res
+
+    def max_distance_squared(self, point) -> float:
+        res = 0
+        for dim, (lo, hi) in enumerate(zip(self.mins, self.maxs)):
+            value = point.get(dim)
+            d = max(value - lo, hi - value)
+            res += d * d
+        return res
+
+    def intersects(self, other) -> bool:
+        return all(
+            lo <= other.get_max(dim) and other.get_min(dim) <= hi
+            for dim, (lo, hi) in enumerate(zip(self.mins, self.maxs))
+        )
+
+    def contains_point(self, *coords) -> bool:
+        return all(lo <= c <= hi for lo, c, hi in zip(self.mins, coords, self.maxs))
+
+    def contains(self, point) -> bool:
+        return all(
+            lo <= point.get(dim) <= hi
+            for dim, (lo, hi) in enumerate(zip(self.mins, self.maxs))
+        )
+
+    def contains_rect(self, other) -> bool:
+        return all(
+            lo <= other.get_min(dim) and other.get_max(dim) <= hi
+            for dim, (lo, hi) in enumerate(zip(self.mins, self.maxs))
+        )
+
+    def split(self, dim: int, value: float) -> tuple[BoxArea, BoxArea]:
+        maxs = list(self.maxs)
+        mins = list(self.mins)
+        maxs[dim] = value
+        mins[dim] = value
+        return BoxArea(self.mins, maxs), BoxArea(mins, self.maxs)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BoxArea):
+            return False
+        return self.mins == other.mins and self.maxs == other.maxs
+
+    def __contains__(self, item) -> bool:
+        if isinstance(item, (BoxArea, RectangleArea)):
+            return self.contains_rect(item)
+        else:
+            return self.contains(item)
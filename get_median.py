@@ -1,39 +1,74 @@
-from random import randint
-from geo_structures import Point
-
-
-def get_median(
-    points: list[Point], l: int, r: int, k: int, depth: int, K: int
-) -> Point:
-
-    pivot = rand_partition(points, l, r, depth, K)
-    # wiemy że pivot dzieli liste na w części jedną mniejszą drugą większą
-
-    # Keśli pivot to mediana zwracam go
-    if pivot == k:
-        return points[pivot]
-    elif pivot > k:
-        # Szukam mediany w lewej części
-        return get_median(points, l, pivot - 1, k, depth, K)
-    else:
-        # Szukam mediany w prawej części
-        return get_median(points, pivot + 1, r, k, depth, K)
-
-
-def rand_partition(points: list[Point], l: int, r: int, depth: int, K: int) -> int:
-    # Wybierz losowy pivot i zamień go z ostatnim elementem
-    rand_num = randint(l, r)
-    points[rand_num], points[r] = points[r], points[rand_num]
-
-    # Pobierz wartość pivotu (x lub y w zależności od głębokości)
-    pivot = points[r].get(depth % K)
-    i = l - 1  # Indeks najmniejszego elementu
-
-    # Podziel listę na mniejsze i większe od pivotu
-    for j in range(l, r):
-        if points[j].get(depth % K) < pivot:
-            i += 1
-            points[j], points[i] = points[i], points[j]  # Zamień elementy
-    i += 1
-    points[i], points[r] = points[r], points[i]
-    return i
+from random import randint
+from geo_structures import Point
+
+
+def get_median(
+    points: list[Point], l: int, r: int, k: int, depth: int, K: int
+) -> Point:
+    return select(points, l, r, k, depth % K)
+
+
+def select(points: list[Point], l: int, r: int, k: int, dim: int) -> Point:
+    # Introselect: najpierw losowe pivoty, a gdy jest ich podejrzanie dużo (złe podziały),
+    # przechodzimy na deterministyczną medianę median, która gwarantuje czas liniowy
+    random_steps = 2 * max(1, (r - l + 1).bit_length())
+
+    # Zamiast rekurencji zawężamy przedział [l, r] w pętli
+    while l < r:
+        if random_steps > 0:
+            pivot = randint(l, r)
+            random_steps -= 1
+        else:
+            pivot = median_of_medians(points, l, r, dim)
+
+        # wiemy że pivot dzieli liste na trzy części: mniejsze, równe i większe
+        lt, gt = partition(points, l, r, pivot, dim)
+
+        if k < lt:
+            # Szukam mediany w lewej części
+            r = lt - 1
+        elif k > gt:
+            # Szukam mediany w prawej części
+            l = gt + 1
+        else:
+            # k trafia w elementy równe pivotowi, więc to mediana
+            return points[k]
+
+    return points[k]
+
+
+def partition(points: list[Point], l: int, r: int, pivot: int, dim: int) -> tuple[int, int]:
+    # Podział na trzy części (flaga holenderska): [l, lt) mniejsze, [lt, gt] równe, (gt, r] większe.
+    # Dzięki temu wiele równych współrzędnych nie psuje podziału
+    value = points[pivot].get(dim)
+    lt = l
+    i = l
+    gt = r
+    while i <= gt:
+        current = points[i].get(dim)
+        if current < value:
+            points[lt], points[i] = points[i], points[lt]  # Zamień elementy
+            lt += 1
+            i += 1
+        elif current > value:
+            points[gt], points[i] = points[i], points[gt]
+            gt -= 1
+        else:
+            i += 1
+    return lt, gt
+
+
+def median_of_medians(points: list[Point], l: int, r: int, dim: int) -> int:
+    # Mediany grup po 5 elementów przenosimy na początek przedziału
+    # i wybieramy spośród nich medianę, która jest dobrym pivotem
+    groups = 0
+    for start in range(l, r + 1, 5):
+        end = min(start + 4, r)
+        group = sorted(points[start : end + 1], key=lambda p: p.get(dim))
+        points[start : end + 1] = group
+        median = start + (end - start) // 2
+        points[l + groups], points[median] = points[median], points[l + groups]
+        groups += 1
+
+    select(points, l, l + groups - 1, l + (groups - 1) // 2, dim)
+    return l + (groups - 1) // 2
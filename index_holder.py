@@ -0,0 +1,60 @@
+from __future__ import annotations
+import threading
+from contextlib import contextmanager
+from geo_structures import RectangleArea, Point
+
+# Zasady współbieżności dla KdTree i Quadtree:
+# - find, iter_find, find_many, count, nearest, within_radius tylko czytają drzewo
+#   i każde wywołanie ma własną listę wyników, więc wiele wątków może je wołać naraz,
+# - insert, remove, move zmieniają drzewo i nie mogą biec równolegle z niczym innym.
+# Zamiast modyfikować drzewo, z którego czytają inne wątki, budujemy nowe
+# i podmieniamy je w IndexHolder.
+
+
+class IndexSnapshot:
+    # Niezmienna para (drzewo, wersja). Czytelnik trzyma ją przez cały czas zapytania,
+    # więc nawet po podmianie drzewa dokończy pracę na tej samej wersji
+    __slots__ = ("tree", "version")
+
+    def __init__(self, tree, version: int):
+        object.__setattr__(self, "tree", tree)
+        object.__setattr__(self, "version", version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+class IndexHolder:
+    def __init__(self, tree=None):
+        # Czytelnicy nigdy nie czekają: aktualna migawka to jedna referencja, a jej
+        # odczyt i przypisanie są atomowe. Zamek chroni tylko piszących przed sobą nawzajem
+        self.write_lock = threading.Lock()
+        self.current = IndexSnapshot(tree, 0)
+
+    def snapshot(self) -> IndexSnapshot:
+        return self.current
+
+    @contextmanager
+    def pin(self):
+        # with holder.pin() as snapshot: ... - wszystkie zapytania w bloku widzą tę samą wersję
+        yield self.current
+
+    def swap(self, tree, expected_version: int | None = None) -> int:
+        # Atomowa podmiana drzewa. Z expected_version podmiana się nie uda, jeśli w międzyczasie
+        # ktoś inny podmienił drzewo (np. dwa równoległe zadania przebudowy)
+        with self.write_lock:
+            version = self.current.version
+            if expected_version is not None and expected_version != version:
+                raise ValueError(
+                    f"Index version is {version}, expected {expected_version}"
+                )
+            self.current = IndexSnapshot(tree, version + 1)
+            return version + 1
+
+    def rebuild(self, build) -> int:
+        # build() tworzy nowe drzewo poza zamkiem, czytelnicy w tym czasie używają starego
+        expected_version = self.current.version
+        return self.swap(build(), expected_version)
+
+    def find(self, rectangle: RectangleArea) -> list[Point]:
+        return self.current.tree.find(rectangle)
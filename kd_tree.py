@@ -1,60 +1,209 @@
 from __future__ import annotations
+import heapq
+import threading
+import numpy as np
 from get_median import get_median
-from geo_structures import RectangleArea, Point
+from geo_structures import RectangleArea, Point, BoxArea, PointND
+from flat_tree import FlatTree, save_tree
+from point_array import PointArray, coordinates_of, make_points
+from point_io import CHUNK_SIZE, read_coordinates
+from tree_stats import describe_tree
 
-K = 2
+LEAF_SIZE = 64  # domyślna liczba punktów w liściu
 
 
 class KdTreeNode:
-    def __init__(self, axis: int | None, rectangle: RectangleArea) -> None:
+    def __init__(self, axis: int | None, rectangle: RectangleArea | BoxArea) -> None:
 
         self.axis = axis  # określa którą oś rozpatrujemy tj. dla K=2 czy wedługo osi X czy Y/
         self.rectangle = rectangle  # obszar który jesr reprezentowany przez poddtrzewo tego wierzchołka
         self.left_node = None  # lewe dziecko
         self.right_node = None  # prawe dziecko
-        self.leafs_list = []  # list liści w poddrzewie
-        self.leaf_point = None  # jeśli node jest liście to znajduje się tu punkt
+        self.split = None  # wartość mediany, po której dzielimy na lewe i prawe poddrzewo
+        self.start = 0  # poddrzewo obejmuje punkty self.points[start:end] drzewa (liść to kubełek)
+        self.end = 0
+        self.aggregates = {}  # nazwa -> suma fn(punkt) w poddrzewie dla funkcji z add_aggregate
 
 
+# Drzewo po zbudowaniu jest tylko czytane (poza liczeniem sum w add_aggregate),
+# więc zapytania mogą być wołane z wielu wątków naraz. Do podmiany drzewa
+# w trakcie obsługi zapytań służy index_holder.IndexHolder
 class KdTree:
-    def __init__(self, points: list[Point]):
-
-        self.points = points
-        self.max_rectangle = RectangleArea(
-            min(points, key=lambda p: p.x).x,  # Minimalna wartość x
-            min(points, key=lambda p: p.y).y,  # Minimalna wartość y
-            max(points, key=lambda p: p.x).x,  # Maksymalna wartość x
-            max(points, key=lambda p: p.y).y,  # Maksymalna wartość y
-        )
-        self.root = self.build_tree(self.points, 0, self.max_rectangle)
+    def __init__(
+        self,
+        points: list[Point] | np.ndarray,
+        method: str | None = None,
+        workers: int | None = None,
+        leaf_size: int = LEAF_SIZE,
+        observer=None,
+    ):
+        # points to lista punktów Point (lub PointND) albo tablica współrzędnych (n, K)
+        # dla dowolnego K. Domyślna metoda budowy to quickselect dla listy i presort dla tablicy,
+        # partition to szybsza budowa medianami z np.argpartition (bez stałej kolejności remisów).
+        # Węzła z co najwyżej leaf_size punktami nie dzielimy - liść to kubełek punktów
+        # sprawdzany jedną maską, więc węzłów jest około 2n / leaf_size zamiast 2n.
+        # Puste wejście daje puste drzewo (root = None), jak w Quadtree
+        if isinstance(points, np.ndarray):
+            coords = points.astype(np.float64, copy=False)
+            if coords.ndim != 2:
+                # Tablica jednowymiarowa to punkty na prostej, a pusta - zero punktów na płaszczyźnie
+                coords = coords.reshape(len(coords), -1) if len(coords) else coords.reshape(0, 2)
+            objects = None
+        else:
+            coords = coordinates_of(points)
+            objects = points
+        if not np.isfinite(coords).all():
+            # Jeden NaN w granicach korzenia sprawiłby, że żadne zapytanie nic nie znajdzie
+            raise ValueError("Cannot build a tree from points with non-finite coordinates")
+        if method is None:
+            method = "quickselect" if objects is not None else "presort"
+        if method not in ("quickselect", "presort", "partition"):
+            raise ValueError(f"Unknown build method: {method}")
+
+        self.K = coords.shape[1]  # liczba wymiarów
+        self.leaf_size = max(1, leaf_size)
+        self.ids = None  # identyfikatory punktów w kolejności self.points (tylko from_arrays)
+        self.observer = None  # tree_observer.TreeObserver, podpinany przez attach
+        self.aggregate_functions = {}  # nazwa -> funkcja, której sumy trzymamy w węzłach
+        self.aggregate_lock = threading.Lock()  # rejestracja funkcji z wielu wątków
+        self.max_rectangle = self.bounding_box(coords)
+
+        if len(coords) == 0:
+            self.root, order = None, np.empty(0, dtype=np.intp)
+        elif workers is not None and workers > 1:
+            # Górne poziomy budujemy tutaj, a poddrzewa w osobnych procesach
+            from parallel_build import build_kd_tree_parallel
+
+            self.root, order = build_kd_tree_parallel(self, coords, method, workers)
+        elif method == "quickselect":
+            self.root, order = self.build_tree_quickselect(coords)
+        elif method == "partition":
+            self.root, order = self.build_tree_partitioned(coords)
+        else:
+            self.root, order = self.build_tree_presorted(coords)
+
+        # Punkty w kolejności liści od lewej do prawej, więc każde poddrzewo
+        # to spójny przedział tej listy. indices[i] to numer punktu self.points[i] na wejściu,
+        # a coords to ich współrzędne w tej samej kolejności
+        self.indices = order
+        self.coords = coords[order]
+        if objects is not None:
+            self.points = [objects[i] for i in order.tolist()]
+        else:
+            self.points = PointArray(*self.coords.T)
+        if observer is not None:
+            self.attach(observer)
+
+    @classmethod
+    def from_arrays(
+        cls, xs, ys=None, ids=None, leaf_size: int = LEAF_SIZE, method: str = "presort"
+    ) -> KdTree:
+        # Budowa wprost z tablic współrzędnych (metodą presort albo partition), bez tworzenia
+        # punktu dla każdego wiersza - self.points to wtedy PointArray. Przyjmujemy dwie tablice
+        # xs/ys albo jedną tablicę (n, K). ids to opcjonalne identyfikatory punktów
+        if ys is None:
+            coords = np.asarray(xs, dtype=np.float64)
+        else:
+            xs = np.asarray(xs, dtype=np.float64)
+            ys = np.asarray(ys, dtype=np.float64)
+            if len(xs) != len(ys):
+                raise ValueError("xs and ys must have the same length")
+            coords = np.column_stack((xs, ys))
+        if ids is not None and len(ids) != len(coords):
+            raise ValueError("ids must have one entry per point")
+
+        tree = cls(coords, method, leaf_size=leaf_size)
+        if ids is not None:
+            tree.ids = np.asarray(ids)[tree.indices]
+        return tree
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        x_column: int | str = 0,
+        y_column: int | str = 1,
+        id_column: int | str | None = None,
+        chunk_size: int = CHUNK_SIZE,
+        leaf_size: int = LEAF_SIZE,
+    ) -> KdTree:
+        # Plik .npy, .csv albo .parquet czytany porcjami (point_io.read_coordinates)
+        xs, ys, ids = read_coordinates(path, x_column, y_column, id_column, chunk_size)
+        return cls.from_arrays(xs, ys, ids, leaf_size)
+
+    def attach(self, observer) -> None:
+        # Podpina obserwatora (tree_observer.TreeObserver) i odtwarza mu budowę drzewa:
+        # podziały w kolejności preorder, jak przy rekurencyjnym build_tree
+        self.observer = observer
+        observer.tree_built(self, self.points)
+        stack = [(self.root, 0)] if self.root is not None else []
+        while stack:
+            node, depth = stack.pop()
+            if node.left_node is None:
+                continue
+            observer.node_split(node, [node.left_node, node.right_node], depth)
+            stack.append((node.right_node, depth + 1))
+            stack.append((node.left_node, depth + 1))
+
+    def detach(self) -> None:
+        self.observer = None
+
+    @staticmethod
+    def bounding_box(coords: np.ndarray) -> RectangleArea | BoxArea | None:
+        # Najmniejszy obszar zawierający punkty: prostokąt dla K = 2, prostopadłościan dla innych K
+        if len(coords) == 0:
+            return None
+        mins = coords.min(axis=0).tolist()
+        maxs = coords.max(axis=0).tolist()
+        if len(mins) == 2:
+            return RectangleArea(mins[0], mins[1], maxs[0], maxs[1])
+        return BoxArea(mins, maxs)
+
+    def query_bounds(self, rectangle: RectangleArea | BoxArea) -> tuple[np.ndarray, np.ndarray]:
+        # Minima i maksima szukanego obszaru jako tablice, do sprawdzania kubełków maską
+        extrema = rectangle.get_extrema()
+        if len(extrema) != 2 * self.K:
+            raise ValueError(f"Expected a {self.K}-dimensional query box")
+        extrema = np.array(extrema, dtype=np.float64)
+        return extrema[: self.K], extrema[self.K :]
+
+    @staticmethod
+    def split_rectangle(
+        rectangle: RectangleArea | BoxArea, axis: int, median: float
+    ) -> tuple[RectangleArea | BoxArea, RectangleArea | BoxArea]:
+        # Podział wzdłuż dowolnej osi
+        return rectangle.split(axis, median)
 
     def build_tree(
-        self, points: list[Point], depth: int, rectangle: RectangleArea
+        self, points: list[Point], depth: int, rectangle: RectangleArea, start: int = 0
     ) -> KdTreeNode:
 
-        # Jeśli w poddrzewie jest 1 punkt, to jest to liść
-        if len(points) == 1:
+        # Jeśli w poddrzewie jest najwyżej leaf_size punktów, to jest to liść
+        if len(points) <= self.leaf_size:
             node = KdTreeNode(None, rectangle)
-            node.leaf_point = points[0]
+            node.start = start
+            node.end = start + len(points)
+            self.points[start : node.end] = points
             return node
 
         p_smaller = []  # lista na punkt mniejsze od mediany
         p_larger = []
 
+        axis = depth % self.K
         median_point = get_median(
-            points, 0, len(points) - 1, (len(points) - 1) // 2, depth, K
+            points, 0, len(points) - 1, (len(points) - 1) // 2, depth, self.K
         )
 
         # Mediana w wymiarze
-        median = median_point.get(depth % K)
+        median = median_point.get(axis)
 
         # Wrzuca punkty na lewo i prawo od mediany
         balanser = 0  # balansuje drzewo
 
         for point in points:
-            if point.get(depth % K) < median:
+            if point.get(axis) < median:
                 p_smaller.append(point)
-            elif point.get(depth % K) > median:
+            elif point.get(axis) > median:
                 p_larger.append(point)
             else:
                 if balanser % 2 == 0:
@@ -65,55 +214,471 @@ class KdTree:
 
         # print(p_smaller," _ ",p_larger)
 
-        min_x, min_y, max_x, max_y = rectangle.get_extrema()
-        if depth % K == 0:  # Podział wzdłuż osi x
-            node_smaller = self.build_tree(
-                p_smaller, depth + 1, RectangleArea(min_x, min_y, median, max_y)
-            )
-            node_larger = self.build_tree(
-                p_larger, depth + 1, RectangleArea(median, min_y, max_x, max_y)
-            )
-        else:  # Podział wzdłuż osi y
-            node_smaller = self.build_tree(
-                p_smaller, depth + 1, RectangleArea(min_x, min_y, max_x, median)
-            )
-            node_larger = self.build_tree(
-                p_larger, depth + 1, RectangleArea(min_x, median, max_x, max_y)
-            )
+        rect_smaller, rect_larger = self.split_rectangle(rectangle, axis, median)
+        node_smaller = self.build_tree(p_smaller, depth + 1, rect_smaller, start)
+        node_larger = self.build_tree(
+            p_larger, depth + 1, rect_larger, start + len(p_smaller)
+        )
 
         # łączymy postrekurenycjnie noda z jego dziećmi
-        node = KdTreeNode(depth, rectangle)
+        node = KdTreeNode(axis, rectangle)
+        node.split = median
+        node.start = start
+        node.end = start + len(points)
         node.left_node = node_smaller
         node.right_node = node_larger
 
-        if node.left_node.leaf_point is not None:
-            node.leafs_list.append(node_smaller)
-        else:
-            node.leafs_list.extend(node.left_node.leafs_list)
+        return node
 
-        if node.right_node.leaf_point is not None:
-            node.leafs_list.append(node_larger)
-        else:
-            node.leafs_list.extend(node.right_node.leafs_list)
+    def build_tree_quickselect(
+        self,
+        coords: np.ndarray,
+        depth: int = 0,
+        rectangle: RectangleArea | BoxArea | None = None,
+    ) -> tuple[KdTreeNode, np.ndarray]:
+        # build_tree na nowych obiektach punktów; po budowie odczytujemy, w jakiej kolejności
+        # trafiły do liści. Zwraca korzeń i kolejność liści, tak jak build_tree_presorted
+        points = make_points(coords)
+        index_of = {id(p): i for i, p in enumerate(points)}
+        self.points = [None] * len(points)
+        root = self.build_tree(
+            points, depth, rectangle if rectangle is not None else self.max_rectangle
+        )
+        order = np.fromiter(
+            (index_of[id(p)] for p in self.points), dtype=np.intp, count=len(points)
+        )
+        return root, order
 
-        return node
+    def build_tree_presorted(
+        self,
+        coords: np.ndarray,
+        depth: int = 0,
+        rectangle: RectangleArea | BoxArea | None = None,
+        start: int = 0,
+    ) -> tuple[KdTreeNode, np.ndarray]:
+        # Klasyczna budowa w O(n log n): indeksy sortujemy raz według każdej osi,
+        # a potem na każdym poziomie dzielimy posortowane tablice w miejscu,
+        # zachowując ich uporządkowanie. Nie ma losowości ani rekurencji.
+        # Zwraca korzeń i kolejność liści: order[i] to wiersz coords punktu self.points[start + i]
+        n = len(coords)
+        columns = [np.ascontiguousarray(coords[:, axis]) for axis in range(self.K)]
+        sorted_by = [np.argsort(c, kind="stable") for c in columns]
+        in_left = np.zeros(n, dtype=bool)  # znacznik punktów trafiających do lewego poddrzewa
 
-    def find_recursive(
-        self, node: KdTreeNode, rectangle: RectangleArea, res: list[Point]
-    ):
-        if (
-            rectangle & node.rectangle is None
-        ):  # szukany obaszar jest poza obecnym obszarem
+        root = KdTreeNode(None, rectangle if rectangle is not None else self.max_rectangle)
+        # Węzeł odpowiada przedziałowi [lo, hi) we wszystkich posortowanych tablicach
+        stack = [(root, 0, n, depth)]
+        while stack:
+            node, lo, hi, depth = stack.pop()
+            node.start = start + lo
+            node.end = start + hi
+
+            # Jeśli w poddrzewie jest najwyżej leaf_size punktów, to jest to liść
+            if hi - lo <= self.leaf_size:
+                continue
+
+            axis = depth % self.K
+            # Lewa część ma (n + 1) // 2 punktów, jak przy get_median, a mediana to jej ostatni punkt
+            mid = lo + (hi - lo + 1) // 2
+            left_indices = sorted_by[axis][lo:mid]
+            median = columns[axis][left_indices[-1]]
+
+            # Pozostałe osie dzielimy stabilnie, więc obie części zostają posortowane
+            in_left[left_indices] = True
+            for other in range(self.K):
+                if other != axis:
+                    segment = sorted_by[other][lo:hi]
+                    mask = in_left[segment]
+                    sorted_by[other][lo:hi] = np.concatenate((segment[mask], segment[~mask]))
+            in_left[left_indices] = False
+
+            node.axis = axis
+            node.split = median
+            rect_smaller, rect_larger = self.split_rectangle(node.rectangle, axis, median)
+            node.left_node = KdTreeNode(None, rect_smaller)
+            node.right_node = KdTreeNode(None, rect_larger)
+            stack.append((node.right_node, mid, hi, depth + 1))
+            stack.append((node.left_node, lo, mid, depth + 1))
+
+        # Przedział liścia we wszystkich tablicach zawiera te same punkty, więc kolejność liści
+        # to po prostu sorted_by[0]
+        return root, sorted_by[0]
+
+    def build_tree_partitioned(
+        self,
+        coords: np.ndarray,
+        depth: int = 0,
+        rectangle: RectangleArea | BoxArea | None = None,
+        start: int = 0,
+    ) -> tuple[KdTreeNode, np.ndarray]:
+        # Budowa w O(n log n) bez sortowania: na każdym poziomie medianę wyznacza wektorowo
+        # np.argpartition na przedziale permutacji węzła. Podział jak w build_tree_presorted
+        # (lewa część ma (n + 1) // 2 punktów), ale punkty równe medianie trafiają na stronę
+        # wybraną przez argpartition. Zwraca korzeń i kolejność liści
+        n = len(coords)
+        order = np.arange(n, dtype=np.intp)
+
+        root = KdTreeNode(None, rectangle if rectangle is not None else self.max_rectangle)
+        stack = [(root, 0, n, depth)]
+        while stack:
+            node, lo, hi, depth = stack.pop()
+            node.start = start + lo
+            node.end = start + hi
+
+            # Jeśli w poddrzewie jest najwyżej leaf_size punktów, to jest to liść
+            if hi - lo <= self.leaf_size:
+                continue
+
+            axis = depth % self.K
+            mid = lo + (hi - lo + 1) // 2
+            segment = order[lo:hi]
+            order[lo:hi] = segment[np.argpartition(coords[segment, axis], mid - lo - 1)]
+            median = coords[order[mid - 1], axis]
+
+            node.axis = axis
+            node.split = median
+            rect_smaller, rect_larger = self.split_rectangle(node.rectangle, axis, median)
+            node.left_node = KdTreeNode(None, rect_smaller)
+            node.right_node = KdTreeNode(None, rect_larger)
+            stack.append((node.right_node, mid, hi, depth + 1))
+            stack.append((node.left_node, lo, mid, depth + 1))
+
+        return root, order
+
+    def scan_leaf(self, node: KdTreeNode, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        # Pozycje (w self.points) punktów kubełka leżących w obszarze - jedna maska na cały liść
+        block = self.coords[node.start : node.end]
+        inside = ((block >= low) & (block <= high)).all(axis=1)
+        return node.start + np.flatnonzero(inside)
+
+    def traverse(self, covers, reaches, observer=None):
+        # Wspólne przejście drzewa dla zapytań o obszar. Generator par (węzeł, głębokość, cały)
+        # w kolejności liści (lewe poddrzewo przed prawym): cały=True dla poddrzew, których
+        # obszar w całości leży w zapytaniu (covers(węzeł)), cały=False dla pozostałych liści,
+        # których punkty trzeba sprawdzić. reaches(węzeł) mówi, czy obszar węzła ma część wspólną
+        # z zapytaniem - pozostałych nie odwiedzamy. observer dostaje node_visited i node_pruned
+        if self.root is None:
             return
-        if node.leaf_point is not None and node.leaf_point in rectangle:
-            res.append(
-                node.leaf_point
-            )  # node jest liściem i jest w obszarze więc dodajemy
+        if not reaches(self.root):
+            if observer is not None:
+                observer.node_pruned(self.root, 0)
             return
-        for leaf_node in node.leafs_list:  # wchodzimy głębiej
-            self.find_recursive(leaf_node, rectangle, res)
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if observer is not None:
+                observer.node_visited(node, depth)
+            if covers(node):
+                yield node, depth, True
+            elif node.left_node is None:
+                yield node, depth, False
+            else:
+                for child in (node.right_node, node.left_node):
+                    if reaches(child):
+                        stack.append((child, depth + 1))
+                    elif observer is not None:
+                        observer.node_pruned(child, depth + 1)
 
-    def find(self, rectangle: RectangleArea) -> list[Point]:
+    def traverse_rectangle(self, rectangle: RectangleArea | BoxArea, observer=None):
+        # traverse dla prostokąta (prostopadłościanu); zwraca też granice do scan_leaf
+        low, high = self.query_bounds(rectangle)
+        nodes = self.traverse(
+            lambda node: rectangle.contains_rect(node.rectangle),
+            lambda node: rectangle.intersects(node.rectangle),
+            observer,
+        )
+        return nodes, low, high
+
+    def find(self, rectangle: RectangleArea | BoxArea, stats=None) -> list[Point]:
+        # stats (query_stats.QueryStats) zbiera statystyki tego zapytania zamiast
+        # podpiętego obserwatora
+        if stats is not None or self.observer is not None:
+            return self.find_observed(rectangle, stats if stats is not None else self.observer)
+        nodes, low, high = self.traverse_rectangle(rectangle)
         res = []
-        self.find_recursive(self.root, rectangle, res)
+        for node, _, whole in nodes:
+            if whole:  # całe poddrzewo to spójny przedział self.points
+                res.extend(self.points[node.start : node.end])
+            else:
+                res.extend(self.points[i] for i in self.scan_leaf(node, low, high).tolist())
         return res
+
+    def find_observed(self, rectangle: RectangleArea | BoxArea, observer) -> list[Point]:
+        # find z powiadamianiem obserwatora; osobna metoda, żeby zwykłe find nie płaciło
+        # za wywołania obserwatora. Kolejność wyników jak w find
+        observer.query_started(self, rectangle)
+        nodes, low, high = self.traverse_rectangle(rectangle, observer)
+        res = []
+        for node, depth, whole in nodes:
+            if whole:
+                found = self.points[node.start : node.end]
+                observer.subtree_reported(node, depth, len(found))
+            else:
+                found = [self.points[i] for i in self.scan_leaf(node, low, high).tolist()]
+                observer.leaf_scanned(node, depth, node.end - node.start, len(found))
+            for point in found:
+                observer.point_reported(point)
+            res.extend(found)
+        observer.query_finished(self, rectangle, res)
+        return res
+
+    def find_positions(self, rectangle: RectangleArea | BoxArea) -> np.ndarray:
+        # Pozycje znalezionych punktów w self.points (kolejność liści), bez tworzenia obiektów Point
+        nodes, low, high = self.traverse_rectangle(rectangle)
+        parts = [
+            np.arange(node.start, node.end) if whole else self.scan_leaf(node, low, high)
+            for node, _, whole in nodes
+        ]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(parts)
+
+    def find_ids(self, rectangle: RectangleArea | BoxArea) -> np.ndarray:
+        # Identyfikatory znalezionych punktów (drzewo musi być zbudowane przez from_arrays z ids)
+        if self.ids is None:
+            raise ValueError("The tree was built without ids")
+        return self.ids[self.find_positions(rectangle)]
+
+    def find_indices(self, rectangle: RectangleArea | BoxArea) -> np.ndarray:
+        # Numery znalezionych punktów na wejściu (wiersze tablicy albo pozycje listy),
+        # jak find_indices w MortonQuadtree
+        return self.indices[self.find_positions(rectangle)]
+
+    def iter_find(self, rectangle: RectangleArea | BoxArea, limit: int | None = None):
+        # Generator: punkty są zwracane od razu, bez budowania listy wyników.
+        # limit pozwala zakończyć przeszukiwanie po znalezieniu tylu punktów
+        if limit is not None and limit <= 0:
+            return
+        nodes, low, high = self.traverse_rectangle(rectangle)
+        found = 0
+        for node, _, whole in nodes:
+            if whole:
+                positions = range(node.start, node.end)
+            else:
+                positions = self.scan_leaf(node, low, high).tolist()
+            for i in positions:
+                yield self.points[i]
+                found += 1
+                if found == limit:
+                    return
+
+    def nearest(self, point: Point | PointND, k: int = 1) -> list[Point]:
+        # Dla K > 2 punkt zapytania to PointND
+        if k <= 0 or self.root is None:
+            return []
+
+        # Przeglądamy węzły od najbliższego (kolejka priorytetowa po odległości od prostokąta),
+        # best to kopiec k najlepszych pozycji w self.points z ujemnymi odległościami
+        target = np.array([point.get(dim) for dim in range(self.K)], dtype=np.float64)
+        best = []
+        queue = [(self.root.rectangle.min_distance_squared(point), 0, self.root)]
+        counter = 1  # rozstrzyga remisy, żeby nie porównywać węzłów
+        while queue:
+            distance, _, node = heapq.heappop(queue)
+            if len(best) == k and distance >= -best[0][0]:
+                break  # żaden pozostały węzeł nie może być bliżej niż k-ty najlepszy
+
+            if node.left_node is None:
+                block = self.coords[node.start : node.end]
+                distances = ((block - target) ** 2).sum(axis=1).tolist()
+                for i, d in enumerate(distances, node.start):
+                    item = (-d, counter, i)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item[0] > best[0][0]:
+                        heapq.heapreplace(best, item)
+                    counter += 1
+                continue
+
+            for child in (node.left_node, node.right_node):
+                child_distance = child.rectangle.min_distance_squared(point)
+                if len(best) < k or child_distance < -best[0][0]:
+                    heapq.heappush(queue, (child_distance, counter, child))
+                    counter += 1
+
+        return [
+            self.points[i] for _, _, i in sorted(best, key=lambda item: (-item[0], item[1]))
+        ]
+
+    def within_radius(self, point: Point | PointND, r: float) -> list[Point]:
+        # To samo przejście co dla prostokąta, ale obszarem zapytania jest koło (kula)
+        r_squared = r * r
+        target = np.array([point.get(dim) for dim in range(self.K)], dtype=np.float64)
+        nodes = self.traverse(
+            lambda node: node.rectangle.max_distance_squared(point) <= r_squared,
+            lambda node: node.rectangle.min_distance_squared(point) <= r_squared,
+        )
+        res = []
+        for node, _, whole in nodes:
+            if whole:  # cały obszar węzła leży w kole
+                res.extend(self.points[node.start : node.end])
+                continue
+            block = self.coords[node.start : node.end]
+            inside = ((block - target) ** 2).sum(axis=1) <= r_squared
+            res.extend(self.points[i] for i in (node.start + np.flatnonzero(inside)).tolist())
+        return res
+
+    def find_many(self, rectangles) -> tuple[np.ndarray, np.ndarray]:
+        # Prostokąty jako tablica (m, 2K): najpierw K minimów, potem K maksimów, dla K = 2 to
+        # min_x, min_y, max_x, max_y (granice włącznie, jak w RectangleArea).
+        # Wynik w formacie CSR: punkty prostokąta i to self.points[j] dla
+        # j w indices[offsets[i]:offsets[i + 1]]
+        K = self.K
+        rects = np.asarray(rectangles, dtype=np.float64).reshape(-1, 2 * K)
+        m = len(rects)
+        hit_rects = []  # numery prostokątów
+        hit_indices = []  # indeksy punktów w self.points
+
+        # Przechodzimy drzewo raz dla całej paczki, niosąc zbiór aktywnych prostokątów
+        stack = [(self.root, np.arange(m))] if self.root is not None else []
+        while stack:
+            node, active = stack.pop()
+            r = rects[active]
+            extrema = np.array(node.rectangle.get_extrema(), dtype=np.float64)
+            node_min = extrema[:K]
+            node_max = extrema[K:]
+
+            # Odrzucamy prostokąty rozłączne z obszarem węzła
+            hit = (r[:, :K] <= node_max).all(axis=1) & (r[:, K:] >= node_min).all(axis=1)
+            active = active[hit]
+            r = r[hit]
+            if len(active) == 0:
+                continue
+
+            # Prostokąty zawierające cały obszar węzła dostają całe poddrzewo
+            full = (r[:, :K] <= node_min).all(axis=1) & (r[:, K:] >= node_max).all(axis=1)
+            if full.any():
+                full_rects = active[full]
+                hit_rects.append(np.repeat(full_rects, node.end - node.start))
+                hit_indices.append(
+                    np.tile(np.arange(node.start, node.end), len(full_rects))
+                )
+                active = active[~full]
+                r = r[~full]
+                if len(active) == 0:
+                    continue
+
+            if node.left_node is None:
+                # Macierz (aktywne prostokąty) x (punkty kubełka)
+                block = self.coords[node.start : node.end]
+                inside = (
+                    (r[:, None, :K] <= block) & (block <= r[:, None, K:])
+                ).all(axis=2)
+                rect_index, point_index = np.nonzero(inside)
+                hit_rects.append(active[rect_index])
+                hit_indices.append(node.start + point_index)
+                continue
+
+            stack.append((node.right_node, active))
+            stack.append((node.left_node, active))
+
+        if hit_rects:
+            rect_ids = np.concatenate(hit_rects)
+            indices = np.concatenate(hit_indices)
+        else:
+            rect_ids = np.empty(0, dtype=np.intp)
+            indices = np.empty(0, dtype=np.intp)
+
+        order = np.lexsort((indices, rect_ids))
+        offsets = np.zeros(m + 1, dtype=np.intp)
+        np.cumsum(np.bincount(rect_ids, minlength=m), out=offsets[1:])
+        return offsets, indices[order].astype(np.intp)
+
+    def count(self, rectangle: RectangleArea | BoxArea) -> int:
+        # Liczba punktów poddrzewa w całości w obszarze jest znana bez schodzenia
+        nodes, low, high = self.traverse_rectangle(rectangle)
+        return sum(
+            node.end - node.start if whole else len(self.scan_leaf(node, low, high))
+            for node, _, whole in nodes
+        )
+
+    def compute_aggregates(self, name: str, fn) -> None:
+        # Liczymy sumy fn od liści w górę (węzły w kolejności odwrotnej do preorder)
+        order = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            if node.left_node is not None:
+                stack.append(node.left_node)
+                stack.append(node.right_node)
+        for node in reversed(order):
+            if node.left_node is None:
+                node.aggregates[name] = sum(fn(p) for p in self.points[node.start : node.end])
+            else:
+                node.aggregates[name] = (
+                    node.left_node.aggregates[name] + node.right_node.aggregates[name]
+                )
+
+    def add_aggregate(self, name: str, fn) -> None:
+        # Rejestruje funkcję fn(punkt) pod nazwą i liczy jej sumy w poddrzewach (raz, O(n)).
+        # Sumy liczymy przed wpisaniem do rejestru, więc równoległe aggregate nigdy
+        # nie trafi na węzły bez policzonej sumy
+        with self.aggregate_lock:
+            if name in self.aggregate_functions:
+                if self.aggregate_functions[name] is fn:
+                    return
+                raise ValueError(f"Aggregate {name!r} is already registered")
+            self.compute_aggregates(name, fn)
+            self.aggregate_functions = {**self.aggregate_functions, name: fn}
+
+    def remove_aggregate(self, name: str) -> None:
+        with self.aggregate_lock:
+            if name not in self.aggregate_functions:
+                raise ValueError(f"Unknown aggregate: {name!r}")
+            self.aggregate_functions = {
+                key: fn for key, fn in self.aggregate_functions.items() if key != name
+            }
+            stack = [self.root] if self.root is not None else []
+            while stack:
+                node = stack.pop()
+                node.aggregates.pop(name, None)
+                if node.left_node is not None:
+                    stack.append(node.left_node)
+                    stack.append(node.right_node)
+
+    def aggregate(self, rectangle: RectangleArea | BoxArea, name: str):
+        # Suma funkcji zarejestrowanej przez add_aggregate po punktach w prostokącie.
+        # Średnia to aggregate(rectangle, name) / count(rectangle)
+        fn = self.aggregate_functions.get(name)
+        if fn is None:
+            raise ValueError(f"Unknown aggregate: {name!r}")
+        nodes, low, high = self.traverse_rectangle(rectangle)
+        res = 0
+        for node, _, whole in nodes:
+            if whole:
+                res += node.aggregates[name]
+            else:
+                res += sum(fn(self.points[i]) for i in self.scan_leaf(node, low, high).tolist())
+        return res
+
+    def save(self, path: str) -> None:
+        # Zapis drzewa jako płaskich tablic (format opisany w flat_tree)
+        if self.K != 2:
+            raise ValueError("Only 2-dimensional trees can be saved")
+        save_tree(
+            path,
+            "kd_tree",
+            self.root,
+            lambda node: [] if node.left_node is None else [node.left_node, node.right_node],
+            lambda node: self.points[node.start : node.end],
+            lambda node: node.end - node.start,
+            None if self.ids is None else lambda node: self.ids[node.start : node.end],
+            lambda node: self.indices[node.start : node.end],
+        )
+
+    def describe(self) -> dict:
+        # Statystyki budowy (tree_stats.describe_tree): rozkład głębokości liści, histogram
+        # zapełnienia kubełków i pamięć węzłów wewnętrznych i liści (pustych liści KdTree nie ma)
+        return describe_tree(
+            self.root,
+            lambda node: [] if node.left_node is None else [node.left_node, node.right_node],
+            lambda node: node.end - node.start,
+            [self.coords, self.indices, self.ids, self.points],
+        )
+
+    @staticmethod
+    def load(path: str) -> FlatTree:
+        # Tablice są mapowane z dysku bez budowania węzłów; wczytane drzewo jest
+        # tylko do odczytu i obsługuje find, find_positions i count
+        return FlatTree(path, "kd_tree")
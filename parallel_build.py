@@ -0,0 +1,236 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from geo_structures import RectangleArea, BoxArea, Point
+from kd_tree import KdTree, KdTreeNode
+from point_array import coordinates_of, make_points
+from quadtree import Quadtree, QuadtreeNode
+
+# Ile zadań (poddrzew) przypada na jeden proces - kilka, żeby wyrównać obciążenie
+TASKS_PER_WORKER = 4
+
+
+def share_coordinates(
+    coords: np.ndarray,
+) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    # Kopia współrzędnych (n, K) w pamięci współdzielonej, procesy czytają ją bez kopiowania
+    shm = shared_memory.SharedMemory(create=True, size=max(1, coords.size * 8))
+    shared = np.ndarray(coords.shape, dtype=np.float64, buffer=shm.buf)
+    shared[:] = coords
+    return shm, shared
+
+
+def read_shared_rows(name: str, shape: tuple, indices: np.ndarray) -> np.ndarray:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        coords = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        rows = coords[indices]  # indeksowanie tablicą tworzy kopię
+        del coords  # widok musi zniknąć przed zamknięciem pamięci
+    finally:
+        shm.close()
+    return rows
+
+
+def build_kd_subtree(
+    name: str,
+    shape: tuple,
+    indices: np.ndarray,
+    depth: int,
+    rectangle: RectangleArea | BoxArea,
+    start: int,
+    method: str,
+    leaf_size: int,
+) -> tuple[KdTreeNode, np.ndarray]:
+    # Wykonywane w procesie roboczym. Zwraca poddrzewo i indeksy oryginalnych punktów
+    # w kolejności jego liści, żeby nie przesyłać punktów z powrotem
+    coords = read_shared_rows(name, shape, indices)
+    tree = KdTree.__new__(KdTree)
+    tree.K = shape[1]
+    tree.leaf_size = leaf_size
+    if method == "presort":
+        root, order = tree.build_tree_presorted(coords, depth, rectangle)
+    elif method == "partition":
+        root, order = tree.build_tree_partitioned(coords, depth, rectangle)
+    else:
+        root, order = tree.build_tree_quickselect(coords, depth, rectangle)
+
+    # Przesuwamy przedziały na pozycje w całym drzewie
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        node.start += start
+        node.end += start
+        if node.left_node is not None:
+            stack.append(node.left_node)
+            stack.append(node.right_node)
+    return root, indices[order]
+
+
+def build_kd_tree_parallel(
+    tree: KdTree, coords: np.ndarray, method: str, workers: int
+) -> tuple[KdTreeNode, np.ndarray]:
+    # Zwraca korzeń i kolejność liści, tak jak build_tree_presorted
+    n = len(coords)
+    shm, shared = share_coordinates(coords)
+    try:
+        perm = np.arange(n)
+        root = KdTreeNode(None, tree.max_rectangle)
+        tasks = []  # (węzeł zastępczy, początek, koniec, głębokość)
+
+        # Górne poziomy dzielimy szeregowo, aż będzie dość niezależnych poddrzew
+        stack = [(root, 0, n, 0)]
+        while stack:
+            node, lo, hi, depth = stack.pop()
+            if hi - lo <= tree.leaf_size or (1 << depth) >= TASKS_PER_WORKER * workers:
+                tasks.append((node, lo, hi, depth))
+                continue
+
+            axis = depth % tree.K
+            # Lewa część ma (n + 1) // 2 punktów, a mediana to jej największa współrzędna
+            mid = lo + (hi - lo + 1) // 2
+            segment = perm[lo:hi]
+            order = np.argpartition(shared[segment, axis], mid - lo - 1)
+            perm[lo:hi] = segment[order]
+            median = shared[perm[mid - 1], axis]
+
+            node.axis = axis
+            node.split = median
+            node.start = lo
+            node.end = hi
+            rect_smaller, rect_larger = tree.split_rectangle(node.rectangle, axis, median)
+            node.left_node = KdTreeNode(None, rect_smaller)
+            node.right_node = KdTreeNode(None, rect_larger)
+            stack.append((node.right_node, mid, hi, depth + 1))
+            stack.append((node.left_node, lo, mid, depth + 1))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    build_kd_subtree,
+                    shm.name,
+                    shared.shape,
+                    perm[lo:hi],
+                    depth,
+                    node.rectangle,
+                    lo,
+                    method,
+                    tree.leaf_size,
+                )
+                for node, lo, hi, depth in tasks
+            ]
+
+            # Zszywamy: poddrzewo z procesu zastępuje węzeł zastępczy,
+            # a jego kolejność liści trafia na swoje miejsce w perm
+            for (node, lo, hi, depth), future in zip(tasks, futures):
+                subtree, order = future.result()
+                perm[lo:hi] = order
+                node.__dict__.update(subtree.__dict__)
+    finally:
+        del shared
+        shm.close()
+        shm.unlink()
+
+    return root, perm
+
+
+def build_quadtree_subtree(
+    name: str,
+    n: int,
+    indices: np.ndarray,
+    depth: int,
+    extrema: tuple,
+    max_points_per_node: int,
+    max_depth: int,
+    min_cell_size: float,
+) -> QuadtreeNode:
+    # Wykonywane w procesie roboczym
+    points = make_points(read_shared_rows(name, (n, 2), indices))
+    index_of = {id(p): int(i) for p, i in zip(points, indices)}
+
+    tree = Quadtree(
+        [], max_points_per_node, max_depth=max_depth, min_cell_size=min_cell_size
+    )
+    root = QuadtreeNode(RectangleArea(*extrema))
+    tree.build_subtree(root, points, depth)
+
+    # Punkty liści zamieniamy na indeksy oryginalnych punktów
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.is_leaf:
+            node.points = [index_of[id(p)] for p in node.points]
+        else:
+            stack.extend(tree.children(node))
+    return root
+
+
+def build_quadtree_parallel(
+    tree: Quadtree, points: list[Point], workers: int
+) -> QuadtreeNode:
+    n = len(points)
+    shm, coords = share_coordinates(coordinates_of(points))
+    try:
+        perm = np.arange(n)
+        root = QuadtreeNode(tree.max_rectangle)
+        tasks = []  # (węzeł zastępczy, początek, koniec, głębokość)
+
+        # Górne poziomy dzielimy szeregowo, tak jak build_tree_vectorized
+        stack = [(root, 0, n, 0)]
+        while stack:
+            node, lo, hi, depth = stack.pop()
+            node.count = hi - lo
+            if not tree.should_split(node.rectangle, hi - lo, depth):
+                node.points = [points[i] for i in perm[lo:hi].tolist()]
+                continue
+            if 4**depth >= TASKS_PER_WORKER * workers:
+                tasks.append((node, lo, hi, depth))
+                continue
+
+            mid_x, mid_y, quadrants = tree.split_rectangle(node.rectangle)
+            segment = perm[lo:hi]
+            codes = (coords[segment, 0] > mid_x).astype(np.int8) + 2 * (
+                coords[segment, 1] > mid_y
+            ).astype(np.int8)
+            order = np.argsort(codes, kind="stable")
+            perm[lo:hi] = segment[order]
+            bounds = lo + np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=4))))
+
+            children = tree.set_children(node, quadrants)
+            for i, child in enumerate(children):
+                stack.append((child, int(bounds[i]), int(bounds[i + 1]), depth + 1))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    build_quadtree_subtree,
+                    shm.name,
+                    n,
+                    perm[lo:hi],
+                    depth,
+                    node.rectangle.get_extrema(),
+                    tree.max_points_per_node,
+                    tree.max_depth,
+                    tree.min_cell_size,
+                )
+                for node, lo, hi, depth in tasks
+            ]
+
+            # Zszywamy: poddrzewo z procesu zastępuje węzeł zastępczy,
+            # a indeksy w liściach zamieniamy z powrotem na punkty
+            for (node, lo, hi, depth), future in zip(tasks, futures):
+                subtree = future.result()
+                stack = [subtree]
+                while stack:
+                    current = stack.pop()
+                    if current.is_leaf:
+                        current.points = [points[i] for i in current.points]
+                    else:
+                        stack.extend(tree.children(current))
+                node.__dict__.update(subtree.__dict__)
+    finally:
+        del coords
+        shm.close()
+        shm.unlink()
+
+    return root
@@ -0,0 +1,78 @@
+from __future__ import annotations
+import numpy as np
+from geo_structures import Point, PointND
+
+
+class PointArray:
+    # Leniwa sekwencja punktów nad tablicami współrzędnych (po jednej na wymiar): obiekt
+    # punktu powstaje dopiero przy odczycie, więc drzewo zbudowane z tablic nie trzyma obiektu
+    # na każdy wiersz. Dla dwóch wymiarów punkty to Point, dla innych PointND.
+    # ids to opcjonalna kolumna identyfikatorów, pozwalająca odnaleźć rekordy źródłowe
+    def __init__(self, *columns, ids=None):
+        self.columns = tuple(np.asarray(c, dtype=np.float64) for c in columns)
+        self.ids = None if ids is None else np.asarray(ids)
+
+    @property
+    def xs(self) -> np.ndarray:
+        return self.columns[0]
+
+    @property
+    def ys(self) -> np.ndarray:
+        return self.columns[1]
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            if len(self.columns) == 2:
+                return Point(float(self.columns[0][key]), float(self.columns[1][key]))
+            return PointND(float(c[key]) for c in self.columns)
+        # Wycinek, maska albo tablica indeksów - wynik to znowu PointArray (dla wycinka to widok)
+        return PointArray(
+            *(c[key] for c in self.columns),
+            ids=None if self.ids is None else self.ids[key],
+        )
+
+    def __iter__(self):
+        # map wywołuje konstruktor wprost, bez generatora i rozpakowywania krotek wierszy
+        columns = [c.tolist() for c in self.columns]
+        if len(columns) == 2:
+            return map(Point, columns[0], columns[1])
+        return map(PointND, zip(*columns))
+
+    def __contains__(self, point) -> bool:
+        mask = np.ones(len(self), dtype=bool)
+        for dim, c in enumerate(self.columns):
+            mask &= c == point.get(dim)
+        return bool(mask.any())
+
+    def tolist(self) -> list:
+        return list(self)
+
+
+def make_points(coords: np.ndarray) -> list:
+    # Lista nowych obiektów punktów z tablicy (n, K)
+    if coords.shape[1] == 2:
+        return list(map(Point, coords[:, 0].tolist(), coords[:, 1].tolist()))
+    return [PointND(row) for row in coords.tolist()]
+
+
+def coordinates_of(points) -> np.ndarray:
+    # Tablica (n, K) ze współrzędnymi listy punktów Point lub PointND
+    n = len(points)
+    if n > 0 and isinstance(points[0], PointND):
+        return np.array([p.coords for p in points], dtype=np.float64).reshape(n, -1)
+    coords = np.empty((n, 2), dtype=np.float64)
+    coords[:, 0] = np.fromiter((p.x for p in points), dtype=np.float64, count=n)
+    coords[:, 1] = np.fromiter((p.y for p in points), dtype=np.float64, count=n)
+    return coords
+
+
+def to_object_array(points) -> np.ndarray:
+    # Tablica obiektów Point z listy, PointArray albo gotowej tablicy
+    if isinstance(points, np.ndarray):
+        return points
+    res = np.empty(len(points), dtype=object)
+    res[:] = list(points)
+    return res
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import itertools
+import os
+import numpy as np
+
+# Domyślny rozmiar porcji wierszy czytanych naraz z pliku
+CHUNK_SIZE = 1_000_000
+
+
+def read_coordinates(
+    path: str,
+    x_column: int | str = 0,
+    y_column: int | str = 1,
+    id_column: int | str | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    delimiter: str = ",",
+) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    # Czyta współrzędne (i opcjonalnie identyfikatory) z pliku .npy, .csv lub .parquet
+    # porcjami po chunk_size wierszy, bez tworzenia obiektu dla każdego wiersza.
+    # Kolumny wskazujemy numerem albo (dla CSV z nagłówkiem i Parquet) nazwą
+    # Wynik wpisujemy od razu do tablic docelowych o rozmiarze znanym z góry (dla CSV to
+    # liczba linii, a nadmiar po nagłówku i pustych liniach obcinamy na końcu), więc
+    # w pamięci jest tylko jedna kopia współrzędnych i jedna porcja wierszy naraz.
+    # Identyfikatory mogą być tekstem nieznanej długości, więc ich porcje łączymy na końcu
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        chunks = read_npy(path, x_column, y_column, id_column, chunk_size)
+    elif extension in (".csv", ".txt"):
+        chunks = read_csv(path, x_column, y_column, id_column, chunk_size, delimiter)
+    elif extension == ".parquet":
+        chunks = read_parquet(path, x_column, y_column, id_column, chunk_size)
+    else:
+        raise ValueError(f"Unsupported point file format: {extension}")
+
+    capacity = count_rows(path, extension)
+    xs = np.empty(capacity, dtype=np.float64)
+    ys = np.empty(capacity, dtype=np.float64)
+    ids = []
+    filled = 0
+    for chunk_xs, chunk_ys, chunk_ids in chunks:
+        end = filled + len(chunk_xs)
+        xs[filled:end] = chunk_xs
+        ys[filled:end] = chunk_ys
+        bad = np.flatnonzero(~(np.isfinite(xs[filled:end]) & np.isfinite(ys[filled:end])))
+        if len(bad):
+            # Wiersz z NaN albo nieskończonością zepsułby granice drzewa, więc przerywamy
+            raise ValueError(f"Non-finite coordinates in row {filled + bad[0]} of {path}")
+        filled = end
+        if chunk_ids is not None:
+            ids.append(np.asarray(chunk_ids))
+
+    if filled < capacity:
+        # Zmniejszenie w miejscu, bez kopiowania tablic
+        xs.resize(filled, refcheck=False)
+        ys.resize(filled, refcheck=False)
+    if id_column is None:
+        return xs, ys, None
+    return xs, ys, np.concatenate(ids) if ids else np.empty(0)
+
+
+def count_rows(path: str, extension: str) -> int:
+    # Liczba wierszy pliku, a dla plików tekstowych jej górne ograniczenie (liczba linii)
+    if extension == ".npy":
+        return len(np.load(path, mmap_mode="r"))
+    if extension == ".parquet":
+        return parquet_module().ParquetFile(path).metadata.num_rows
+
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 24), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    return lines + (last != b"\n")
+
+
+def read_npy(path, x_column, y_column, id_column, chunk_size):
+    # Tablica (n, c) mapowana z dysku, kopiujemy tylko potrzebne kolumny porcjami
+    data = np.load(path, mmap_mode="r")
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start : start + chunk_size]
+        yield (
+            chunk[:, x_column],
+            chunk[:, y_column],
+            None if id_column is None else chunk[:, id_column],
+        )
+
+
+def read_csv(path, x_column, y_column, id_column, chunk_size, delimiter):
+    with open(path) as f:
+        first = f.readline()
+        header = [name.strip() for name in first.split(delimiter)]
+
+        # Kolumny wskazane nazwą wymagają nagłówka. Przy numerach kolumn pierwszy wiersz
+        # to nagłówek, jeśli jego pola współrzędnych nie są liczbami - kolumny identyfikatorów
+        # nie sprawdzamy, bo identyfikatory bywają tekstem także w wierszach z danymi
+        has_header = any(isinstance(c, str) for c in (x_column, y_column, id_column))
+        if not has_header:
+            try:
+                float(header[x_column])
+                float(header[y_column])
+            except (ValueError, IndexError):
+                has_header = True
+        if has_header:
+            lines = f
+            names = header
+        else:
+            lines = itertools.chain([first], f)
+            names = None
+
+        columns = [column_index(c, names) for c in (x_column, y_column)]
+        if id_column is not None:
+            columns.append(column_index(id_column, names))
+
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                break
+            chunk = [line for line in chunk if line.strip()]  # puste linie pomijamy od razu
+            if not chunk:
+                continue
+            # Współrzędne parsujemy wprost jako liczby, tekst tylko dla kolumny identyfikatorów
+            data = np.loadtxt(
+                chunk, delimiter=delimiter, usecols=columns[:2], ndmin=2, dtype=np.float64
+            )
+            ids = None
+            if id_column is not None:
+                ids = np.loadtxt(
+                    chunk, delimiter=delimiter, usecols=columns[2], ndmin=1, dtype=str
+                )
+            yield data[:, 0], data[:, 1], ids
+
+
+def read_parquet(path, x_column, y_column, id_column, chunk_size):
+    parquet_file = parquet_module().ParquetFile(path)
+    names = parquet_file.schema_arrow.names
+    columns = [names[c] if isinstance(c, int) else c for c in (x_column, y_column)]
+    if id_column is not None:
+        columns.append(names[id_column] if isinstance(id_column, int) else id_column)
+
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield (
+            batch.column(0).to_numpy(),
+            batch.column(1).to_numpy(),
+            None if id_column is None else batch.column(2).to_numpy(),
+        )
+
+
+def parquet_module():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet files requires pyarrow") from e
+    return pq
+
+
+def column_index(column: int | str, names: list[str] | None) -> int:
+    if isinstance(column, int):
+        return column
+    if names is None or column not in names:
+        raise ValueError(f"Column {column!r} not found in the file header")
+    return names.index(column)
@@ -1,6 +1,13 @@
 from __future__ import annotations
-from visualizer.main import Visualizer
+import heapq
+import threading
+import math
+import numpy as np
 from geo_structures import RectangleArea, Point
+from flat_tree import FlatTree, save_tree
+from point_array import PointArray, to_object_array
+from point_io import CHUNK_SIZE, read_coordinates
+from tree_stats import describe_tree
 
 
 class QuadtreeNode:
@@ -12,32 +19,161 @@ class QuadtreeNode:
         self.lower_left = None  # Lewy dolny kwadrant
         self.lower_right = None  # Prawy dolny kwadrant
         self.is_leaf = True  # Czy jest liściem (czy ma dzieci)
+        self.xs = None  # Współrzędne x punktów liścia jako wycinek tablicy (tryb wektorowy)
+        self.ys = None  # Współrzędne y punktów liścia jako wycinek tablicy (tryb wektorowy)
+        self.count = 0  # Liczba punktów w poddrzewie
+        self.aggregates = {}  # Nazwa -> suma fn(punkt) w poddrzewie dla funkcji z add_aggregate
 
     def __str__(self) -> str:
         return f"QuadtreeNode({self.rectangle}, Points={len(self.points)}, is_leaf={self.is_leaf})"
 
 
+# Zapytania (find, iter_find, find_many, count, aggregate, nearest, within_radius) tylko czytają
+# drzewo i mogą być wołane z wielu wątków naraz. insert/remove/move wymagają wyłączności -
+# do podmiany drzewa w trakcie obsługi zapytań służy index_holder.IndexHolder
 class Quadtree:
-    def __init__(self, points: list[Point], max_points_per_node: int = 4):
+    def __init__(
+        self,
+        points: list[Point],
+        max_points_per_node: int = 4,
+        vectorized: bool = False,
+        max_depth: int = 32,
+        min_cell_size: float = 0.0,
+        workers: int | None = None,
+        observer=None,
+    ):
         self.max_points_per_node = max_points_per_node
+        self.max_depth = max_depth  # Maksymalna głębokość drzewa
+        self.min_cell_size = min_cell_size  # Komórek o boku nie większym nie dzielimy
+        self.aggregate_functions = {}  # Nazwa -> funkcja, której sumy trzymamy w węzłach
+        self.aggregate_lock = threading.Lock()  # Rejestracja funkcji z wielu wątków
+        self.ids = None  # Identyfikatory punktów w kolejności self.xs (tylko from_arrays)
+        self.version = 0  # Zwiększana przy każdej zmianie punktów (insert/remove)
+        self.observer = None  # tree_observer.TreeObserver, podpinany przez attach
+
+        # Puste drzewo - korzeń powstanie przy pierwszym insert
+        if not points:
+            self.max_rectangle = None
+            self.root = None
+            if observer is not None:
+                self.attach(observer)
+            return
+
         self.max_rectangle = RectangleArea(
             min(points, key=lambda p: p.x).x,  # Minimalna wartość x
             min(points, key=lambda p: p.y).y,  # Minimalna wartość y
             max(points, key=lambda p: p.x).x,  # Maksymalna wartość x
             max(points, key=lambda p: p.y).y,  # Maksymalna wartość y
         )
-        self.root = self.build_tree(self.max_rectangle, points)
+        if workers is not None and workers > 1:
+            # Górne poziomy budujemy tutaj, a poddrzewa w osobnych procesach
+            # (poddrzewa z procesów mają zwykłe listy w liściach, także przy vectorized)
+            from parallel_build import build_quadtree_parallel
 
-    def build_tree(self, rectangle: RectangleArea, points: list[Point]) -> QuadtreeNode:
-        
-        node = QuadtreeNode(rectangle)
+            self.root = build_quadtree_parallel(self, points, workers)
+        elif vectorized:
+            # Współrzędne i punkty w tablicach, które permutujemy w miejscu podczas budowy
+            self.xs = np.fromiter((p.x for p in points), dtype=np.float64, count=len(points))
+            self.ys = np.fromiter((p.y for p in points), dtype=np.float64, count=len(points))
+            self.points_array = np.empty(len(points), dtype=object)
+            self.points_array[:] = points
+            self.root = self.build_tree_vectorized(self.max_rectangle, 0, len(points))
+        else:
+            self.root = self.build_tree(self.max_rectangle, points)
+        if observer is not None:
+            self.attach(observer)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        xs,
+        ys,
+        ids=None,
+        max_points_per_node: int = 4,
+        max_depth: int = 32,
+        min_cell_size: float = 0.0,
+        copy: bool = True,
+    ) -> Quadtree:
+        # Budowa wektorowa wprost z tablic współrzędnych, bez tworzenia Point dla każdego
+        # wiersza - liście trzymają PointArray nad wycinkami tablic. ids to opcjonalne
+        # identyfikatory punktów (permutowane razem ze współrzędnymi).
+        # Budowa permutuje tablice w miejscu, więc domyślnie pracuje na kopiach; copy=False
+        # oddaje drzewu tablice float64 wywołującego (np. świeżo wczytane z pliku)
+        tree = cls([], max_points_per_node, max_depth=max_depth, min_cell_size=min_cell_size)
+        xs = np.array(xs, dtype=np.float64, copy=copy or None)
+        ys = np.array(ys, dtype=np.float64, copy=copy or None)
+        if len(xs) != len(ys) or (ids is not None and len(ids) != len(xs)):
+            raise ValueError("xs, ys and ids must have the same length")
+        if not (np.isfinite(xs).all() and np.isfinite(ys).all()):
+            # Jak w insert: NaN w granicach korzenia sprawiłby, że żadne zapytanie nic nie znajdzie
+            raise ValueError("Cannot build a tree from points with non-finite coordinates")
+        if len(xs) == 0:
+            return tree
+
+        tree.xs = xs
+        tree.ys = ys
+        tree.ids = None if ids is None else np.array(ids, copy=copy or None)
+        tree.points_array = None
+        tree.max_rectangle = RectangleArea(
+            float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())
+        )
+        tree.root = tree.build_tree_vectorized(tree.max_rectangle, 0, len(xs))
+        return tree
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        x_column: int | str = 0,
+        y_column: int | str = 1,
+        id_column: int | str | None = None,
+        chunk_size: int = CHUNK_SIZE,
+        **kwargs,
+    ) -> Quadtree:
+        # Plik .npy, .csv albo .parquet czytany porcjami (point_io.read_coordinates),
+        # pozostałe parametry trafiają do from_arrays. Wczytane tablice należą tylko do nas,
+        # więc drzewo buduje się na nich bez kopiowania
+        xs, ys, ids = read_coordinates(path, x_column, y_column, id_column, chunk_size)
+        return cls.from_arrays(xs, ys, ids, copy=False, **kwargs)
+
+    def attach(self, observer) -> None:
+        # Podpina obserwatora (tree_observer.TreeObserver) i odtwarza mu budowę drzewa.
+        # Kolejne podziały przy insert są zgłaszane na bieżąco
+        self.observer = observer
+        observer.tree_built(self, self.collect_points(self.root) if self.root is not None else [])
+        if self.root is not None:
+            self.report_splits(self.root, 0)
 
-        # Dodaj punkty do węzła, jeśli nie przekraczają limitu
-        if len(points) <= self.max_points_per_node:
-            node.points = points
-            return node
+    def detach(self) -> None:
+        self.observer = None
+
+    def report_splits(self, node: QuadtreeNode, depth: int) -> None:
+        # Podziały w poddrzewie węzła w kolejności preorder (ćwiartki LD, PD, LG, PG)
+        stack = [(node, depth)]
+        while stack:
+            node, depth = stack.pop()
+            if node.is_leaf:
+                continue
+            children = self.children(node)
+            self.observer.node_split(node, children, depth)
+            stack.extend((child, depth + 1) for child in reversed(children))
+
+    def should_split(self, rectangle: RectangleArea, count: int, depth: int) -> bool:
+        # Węzeł dzielimy tylko jeśli ma za dużo punktów, nie osiągnął maksymalnej głębokości
+        # i jego komórka jest większa niż minimalna. W przeciwnym razie liść staje się
+        # kubełkiem przepełnienia (np. dla wielu identycznych punktów)
+        return (
+            count > self.max_points_per_node
+            and depth < self.max_depth
+            and max(
+                rectangle.max_x - rectangle.min_x, rectangle.max_y - rectangle.min_y
+            )
+            > self.min_cell_size
+        )
 
-        # Inaczej, dzielimy przestrzeń na cztery ćwiartki
+    @staticmethod
+    def split_rectangle(rectangle: RectangleArea) -> tuple[float, float, list[RectangleArea]]:
+        # Dzielimy przestrzeń na cztery ćwiartki
         mid_x = (rectangle.min_x + rectangle.max_x) / 2
         mid_y = (rectangle.min_y + rectangle.max_y) / 2
 
@@ -48,45 +184,624 @@ class Quadtree:
             RectangleArea(rectangle.min_x, mid_y, mid_x, rectangle.max_y),  # Lewy górny
             RectangleArea(mid_x, mid_y, rectangle.max_x, rectangle.max_y),  # Prawy górny
         ]
+        return mid_x, mid_y, quadrants
 
-        # Dzielimy punkty na ćwiartki
-        quadrant_points = [[] for _ in range(4)]
-        for point in points:
-            for i, q in enumerate(quadrants):
-                if point in q:  # Punkt w obrębie danego kwadrantu
-                    quadrant_points[i].append(point)
-                    break
-
+    @staticmethod
+    def set_children(node: QuadtreeNode, quadrants: list[RectangleArea]) -> list[QuadtreeNode]:
         # Tworzymy dzieci (ćwiartki) dla węzła
         node.is_leaf = False
-        node.lower_left = self.build_tree(quadrants[0], quadrant_points[0])
-        node.lower_right = self.build_tree(quadrants[1], quadrant_points[1])
-        node.upper_left = self.build_tree(quadrants[2], quadrant_points[2])
-        node.upper_right = self.build_tree(quadrants[3], quadrant_points[3])
+        node.lower_left = QuadtreeNode(quadrants[0])
+        node.lower_right = QuadtreeNode(quadrants[1])
+        node.upper_left = QuadtreeNode(quadrants[2])
+        node.upper_right = QuadtreeNode(quadrants[3])
+        return [node.lower_left, node.lower_right, node.upper_left, node.upper_right]
+
+    @staticmethod
+    def children(node: QuadtreeNode) -> list[QuadtreeNode]:
+        return [node.lower_left, node.lower_right, node.upper_left, node.upper_right]
+
+    def build_tree(self, rectangle: RectangleArea, points: list[Point]) -> QuadtreeNode:
+        root = QuadtreeNode(rectangle)
+        # Kopia, bo liść przechowuje tę listę, a insert/remove ją zmieniają
+        self.build_subtree(root, list(points), 0)
+        return root
+
+    def build_subtree(self, root: QuadtreeNode, points: list[Point], depth: int) -> None:
+        # Budujemy iteracyjnie z jawnym stosem, więc głębokość nie zależy od limitu rekurencji
+        stack = [(root, points, depth)]
+        while stack:
+            node, points, depth = stack.pop()
+            node.count = len(points)
+
+            # Dodaj punkty do węzła, jeśli nie przekraczają limitu
+            if not self.should_split(node.rectangle, len(points), depth):
+                node.points = points
+                continue
+
+            mid_x, mid_y, quadrants = self.split_rectangle(node.rectangle)
+
+            # Dzielimy punkty na ćwiartki: 0 - LD, 1 - PD, 2 - LG, 3 - PG. Punkt na granicy
+            # trafia do pierwszej ćwiartki, która go zawiera (w lewo / w dół)
+            quadrant_points = [[] for _ in range(4)]
+            for point in points:
+                quadrant_points[(point.x > mid_x) + 2 * (point.y > mid_y)].append(point)
+
+            children = self.set_children(node, quadrants)
+            for child, child_points in zip(children, quadrant_points):
+                stack.append((child, child_points, depth + 1))
+
+    def build_tree_vectorized(
+        self, rectangle: RectangleArea, lo: int, hi: int
+    ) -> QuadtreeNode:
+        root = QuadtreeNode(rectangle)
+
+        stack = [(root, lo, hi, 0)]
+        while stack:
+            node, lo, hi, depth = stack.pop()
+            node.count = hi - lo
+
+            # Liść przechowuje wycinki tablic zamiast list
+            if not self.should_split(node.rectangle, hi - lo, depth):
+                if self.points_array is not None:
+                    node.points = self.points_array[lo:hi]
+                else:  # from_arrays - punkty powstają dopiero przy odczycie
+                    node.points = PointArray(
+                        self.xs[lo:hi],
+                        self.ys[lo:hi],
+                        ids=None if self.ids is None else self.ids[lo:hi],
+                    )
+                node.xs = self.xs[lo:hi]
+                node.ys = self.ys[lo:hi]
+                continue
+
+            mid_x, mid_y, quadrants = self.split_rectangle(node.rectangle)
+
+            # Numer ćwiartki dla wszystkich punktów naraz: 0 - LD, 1 - PD, 2 - LG, 3 - PG.
+            # Punkty na granicy trafiają tam, gdzie w build_tree (pierwsza pasująca ćwiartka)
+            xs = self.xs[lo:hi]
+            ys = self.ys[lo:hi]
+            codes = (xs > mid_x).astype(np.int8) + 2 * (ys > mid_y).astype(np.int8)
+
+            # Sortujemy stabilnie po numerze ćwiartki, więc każda ćwiartka to spójny przedział
+            order = np.argsort(codes, kind="stable")
+            self.xs[lo:hi] = xs[order]
+            self.ys[lo:hi] = ys[order]
+            if self.points_array is not None:
+                self.points_array[lo:hi] = self.points_array[lo:hi][order]
+            if self.ids is not None:
+                self.ids[lo:hi] = self.ids[lo:hi][order]
+            bounds = lo + np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=4))))
+
+            children = self.set_children(node, quadrants)
+            for i, child in enumerate(children):
+                stack.append((child, int(bounds[i]), int(bounds[i + 1]), depth + 1))
+
+        return root
+
+    @staticmethod
+    def leaf_mask(node: QuadtreeNode, rectangle: RectangleArea) -> np.ndarray:
+        # Maska punktów liścia wektorowego (z node.xs/ys) leżących w prostokącie
+        return (
+            (node.xs >= rectangle.min_x)
+            & (node.xs <= rectangle.max_x)
+            & (node.ys >= rectangle.min_y)
+            & (node.ys <= rectangle.max_y)
+        )
+
+    @staticmethod
+    def scan_leaf(node: QuadtreeNode, rectangle: RectangleArea) -> list[Point]:
+        if node.xs is not None:  # Liść wektorowy - jedna maska zamiast pętli
+            return node.points[Quadtree.leaf_mask(node, rectangle)].tolist()
+        return [p for p in node.points if rectangle.contains_point(p.x, p.y)]
+
+    @staticmethod
+    def make_list_leaf(node: QuadtreeNode) -> None:
+        # Liść wektorowy zamieniamy na zwykłą listę przed modyfikacją
+        if node.xs is not None:
+            node.points = node.points.tolist()
+            node.xs = None
+            node.ys = None
+
+    def grow_root(self, point: Point) -> None:
+        rectangle = self.root.rectangle
+        min_x, min_y, max_x, max_y = rectangle.get_extrema()
+        width = max_x - min_x
+        height = max_y - min_y
+
+        # Zdegenerowanego korzenia (odcinek lub punkt) nie da się podwoić,
+        # więc przebudowujemy drzewo na obszarze obejmującym nowy punkt
+        if width == 0 or height == 0:
+            points = self.collect_points(self.root)
+            self.root = self.build_tree(
+                RectangleArea(
+                    min(min_x, point.x),
+                    min(min_y, point.y),
+                    max(max_x, point.x),
+                    max(max_y, point.y),
+                ),
+                points,
+            )
+            self.compute_aggregates(self.root, self.aggregate_functions)
+            if self.observer is not None:
+                self.report_splits(self.root, 0)
+            return
+
+        # Podwajamy korzeń w stronę punktu, stary korzeń staje się jedną z ćwiartek
+        go_left = point.x < min_x
+        go_down = point.y < min_y
+        new_root = QuadtreeNode(
+            RectangleArea(
+                min_x - width if go_left else min_x,
+                min_y - height if go_down else min_y,
+                max_x if go_left else max_x + width,
+                max_y if go_down else max_y + height,
+            )
+        )
+        _, _, quadrants = self.split_rectangle(new_root.rectangle)
+        children = self.set_children(new_root, quadrants)
+        old_index = (1 if go_left else 0) + (2 if go_down else 0)
+        children[old_index] = self.root
+        (
+            new_root.lower_left,
+            new_root.lower_right,
+            new_root.upper_left,
+            new_root.upper_right,
+        ) = children
+        new_root.count = self.root.count
+        for child in children:
+            if child is not self.root:
+                self.compute_aggregates(child, self.aggregate_functions)
+        self.compute_aggregates(new_root, self.aggregate_functions, recursive=False)
+        self.root = new_root
+        if self.observer is not None:
+            self.observer.node_split(new_root, children, 0)
+
+    def collect_points(self, node: QuadtreeNode) -> list[Point]:
+        # Punkty poddrzewa w kolejności ćwiartek LD, PD, LG, PG, jak w find
+        res = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.is_leaf:
+                res.extend(node.points)
+            else:
+                stack.extend(reversed(self.children(node)))
+        return res
+
+    def insert(self, point: Point) -> None:
+        # NaN nie leży w żadnym prostokącie, więc korzeń rósłby bez końca
+        if not (math.isfinite(point.x) and math.isfinite(point.y)):
+            raise ValueError(f"Cannot insert a point with non-finite coordinates: {point}")
+        self.version += 1
+        if self.root is None:
+            self.root = QuadtreeNode(RectangleArea(point.x, point.y, point.x, point.y))
+            self.root.points = [point]
+            self.root.count = 1
+            self.compute_aggregates(self.root, self.aggregate_functions)
+            self.max_rectangle = self.root.rectangle
+            return
+
+        # Korzeń rośnie, dopóki nie obejmie nowego punktu
+        while not self.root.rectangle.contains_point(point.x, point.y):
+            self.grow_root(point)
+        self.max_rectangle = self.root.rectangle
+
+        # Schodzimy do liścia tą samą regułą co przy budowie (punkty na granicy idą w lewo / w dół)
+        node = self.root
+        path = [node]
+        depth = 0
+        while not node.is_leaf:
+            mid_x, mid_y, _ = self.split_rectangle(node.rectangle)
+            node = self.children(node)[(point.x > mid_x) + 2 * (point.y > mid_y)]
+            path.append(node)
+            depth += 1
+
+        self.make_list_leaf(node)
+        node.points.append(point)
 
-        return node
+        # Aktualizujemy liczniki i sumy na ścieżce od korzenia
+        self.update_path(path, point, 1)
 
-    def find_recursion(
-        self, node: QuadtreeNode, rectangle: RectangleArea
-    ) -> list[Point]:
+        # Przepełniony liść dzielimy tak samo jak przy budowie
+        if self.should_split(node.rectangle, len(node.points), depth):
+            points = node.points
+            node.points = []
+            self.build_subtree(node, points, depth)
+            self.compute_aggregates(node, self.aggregate_functions)
+            if self.observer is not None:
+                self.report_splits(node, depth)
+
+    def remove(self, point: Point) -> None:
+        # Szukamy liścia z punktem. Punkt na granicy ćwiartek może leżeć w kilku
+        # z nich (np. po powiększeniu korzenia), więc sprawdzamy każdą, która go obejmuje
+        path = None
+        stack = [[self.root]] if self.root is not None else []
+        while stack:
+            nodes = stack.pop()
+            node = nodes[-1]
+            if not node.rectangle.contains_point(point.x, point.y):
+                continue
+            if node.is_leaf:
+                if point in node.points:
+                    path = nodes
+                    break
+            else:
+                for child in self.children(node):
+                    stack.append(nodes + [child])
+
+        if path is None:
+            raise ValueError(f"{point} is not in the quadtree")
+        self.version += 1
+
+        leaf = path[-1]
+        self.make_list_leaf(leaf)
+        leaf.points.remove(point)
+        self.update_path(path, point, -1)
+
+        # Scalamy rodzeństwo, które razem mieści się w jednym liściu
+        for node in reversed(path[:-1]):
+            children = self.children(node)
+            if not all(child.is_leaf for child in children):
+                break
+            if node.count > self.max_points_per_node:
+                break
+            node.points = []
+            for child in children:
+                node.points.extend(child.points)
+            node.is_leaf = True
+            node.lower_left = None
+            node.lower_right = None
+            node.upper_left = None
+            node.upper_right = None
+
+    def update_path(self, path: list[QuadtreeNode], point: Point, sign: int) -> None:
+        # Dodanie (sign = 1) lub usunięcie (sign = -1) punktu zmienia statystyki wszystkich przodków
+        for node in path:
+            node.count += sign
+            for name, fn in self.aggregate_functions.items():
+                node.aggregates[name] += sign * fn(point)
+
+    def compute_aggregates(
+        self, node: QuadtreeNode, functions: dict, recursive: bool = True
+    ) -> None:
+        # Liczymy sumy od liści w górę (węzły w kolejności odwrotnej do preorder).
+        # Bez recursive liczymy tylko sam węzeł z gotowych sum jego dzieci
+        if not functions:
+            return
+        order = [node]
+        if recursive:
+            stack = [node]
+            while stack:
+                current = stack.pop()
+                if not current.is_leaf:
+                    children = self.children(current)
+                    order.extend(children)
+                    stack.extend(children)
+        for current in reversed(order):
+            for name, fn in functions.items():
+                if current.is_leaf:
+                    current.aggregates[name] = sum(fn(p) for p in current.points)
+                else:
+                    current.aggregates[name] = sum(
+                        child.aggregates[name] for child in self.children(current)
+                    )
+
+    def move(self, old: Point, new: Point) -> None:
+        self.remove(old)
+        self.insert(new)
+
+    def traverse(self, covers, reaches, observer=None):
+        # Wspólne przejście drzewa dla zapytań o obszar. Generator trójek (węzeł, głębokość, cały)
+        # w kolejności ćwiartek LD, PD, LG, PG: cały=True dla poddrzew, których obszar
+        # w całości leży w zapytaniu (covers(węzeł); covers=None wyłącza ten skrót),
+        # cały=False dla pozostałych liści, których punkty trzeba sprawdzić. reaches(węzeł) mówi,
+        # czy obszar węzła ma część wspólną z zapytaniem - pozostałych nie odwiedzamy.
+        # observer dostaje node_visited i node_pruned
+        if self.root is None:
+            return
+        if not reaches(self.root):
+            if observer is not None:
+                observer.node_pruned(self.root, 0)
+            return
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if observer is not None:
+                observer.node_visited(node, depth)
+            if covers is not None and covers(node):
+                yield node, depth, True
+            elif node.is_leaf:
+                yield node, depth, False
+            else:
+                # Dzieci odkładamy na stos w odwrotnej kolejności, żeby zachować kolejność ćwiartek
+                for child in reversed(self.children(node)):
+                    if reaches(child):
+                        stack.append((child, depth + 1))
+                    elif observer is not None:
+                        observer.node_pruned(child, depth + 1)
+
+    def traverse_rectangle(self, rectangle: RectangleArea, observer=None, wholesale: bool = True):
+        # traverse dla prostokąta; wholesale=False zwraca same liście (np. dla find_ids)
+        return self.traverse(
+            (lambda node: rectangle.contains_rect(node.rectangle)) if wholesale else None,
+            lambda node: node.rectangle.intersects(rectangle),
+            observer,
+        )
+
+    def find(self, rectangle: RectangleArea, stats=None) -> list[Point]:
+        # stats (query_stats.QueryStats) zbiera statystyki tego zapytania zamiast
+        # podpiętego obserwatora
+        if stats is not None or self.observer is not None:
+            return self.find_observed(rectangle, stats if stats is not None else self.observer)
         res = []
-        if (node.rectangle & rectangle is None):  # Jeśli prostokąty nie mają wspólnego obszaru
-            return res
+        for node, _, whole in self.traverse_rectangle(rectangle):
+            res.extend(self.collect_points(node) if whole else self.scan_leaf(node, rectangle))
+        return res
+
+    def find_observed(self, rectangle: RectangleArea, observer) -> list[Point]:
+        # find z powiadamianiem obserwatora; osobna metoda, żeby zwykłe find nie płaciło
+        # za wywołania obserwatora. Kolejność wyników jak w find
+        observer.query_started(self, rectangle)
+        res = []
+        for node, depth, whole in self.traverse_rectangle(rectangle, observer):
+            if whole:
+                found = self.collect_points(node)
+                observer.subtree_reported(node, depth, len(found))
+            else:
+                found = self.scan_leaf(node, rectangle)
+                observer.leaf_scanned(node, depth, len(node.points), len(found))
+            for point in found:
+                observer.point_reported(point)
+            res.extend(found)
+        observer.query_finished(self, rectangle, res)
+        return res
+
+    def find_ids(self, rectangle: RectangleArea) -> np.ndarray:
+        # Identyfikatory punktów w prostokącie dla drzewa z from_arrays(..., ids=...).
+        # Liście zmienione przez insert/remove trzymają zwykłe punkty i tracą identyfikatory
+        parts = []
+        for node, _, _ in self.traverse_rectangle(rectangle, wholesale=False):
+            if len(node.points) == 0:
+                continue
+            if not isinstance(node.points, PointArray) or node.points.ids is None:
+                raise ValueError("The quadtree has no ids for some of its points")
+            parts.append(node.points.ids[self.leaf_mask(node, rectangle)])
+        if not parts:
+            return np.empty(0, dtype=self.ids.dtype if self.ids is not None else object)
+        return np.concatenate(parts)
+
+    def iter_find(self, rectangle: RectangleArea, limit: int | None = None):
+        # Generator: punkty są zwracane od razu, bez budowania listy wyników.
+        # limit pozwala zakończyć przeszukiwanie po znalezieniu tylu punktów
+        if limit is not None and limit <= 0:
+            return
+
+        found = 0
+        for node, _, whole in self.traverse_rectangle(rectangle):
+            for point in self.collect_points(node) if whole else self.scan_leaf(node, rectangle):
+                yield point
+                found += 1
+                if found == limit:
+                    return
+
+    def nearest(self, point: Point, k: int = 1) -> list[Point]:
+        if k <= 0 or self.root is None:
+            return []
+
+        # Przeglądamy węzły od najbliższego (kolejka priorytetowa po odległości od prostokąta),
+        # best to kopiec k najlepszych punktów z ujemnymi odległościami
+        best = []
+        queue = [(self.root.rectangle.min_distance_squared(point), 0, self.root)]
+        counter = 1  # rozstrzyga remisy, żeby nie porównywać węzłów
+        while queue:
+            distance, _, node = heapq.heappop(queue)
+            if len(best) == k and distance >= -best[0][0]:
+                break  # żaden pozostały węzeł nie może być bliżej niż k-ty najlepszy
+
+            if node.is_leaf:
+                for p in node.points:
+                    item = (-p.distance_squared(point), counter, p)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item[0] > best[0][0]:
+                        heapq.heapreplace(best, item)
+                    counter += 1
+                continue
+
+            for child in self.children(node):
+                child_distance = child.rectangle.min_distance_squared(point)
+                if len(best) < k or child_distance < -best[0][0]:
+                    heapq.heappush(queue, (child_distance, counter, child))
+                    counter += 1
 
-        # Jeśli to liść, sprawdzamy punkty
-        if node.is_leaf:
-            res.extend([p for p in node.points if p in rectangle])
+        return [p for _, _, p in sorted(best, key=lambda item: (-item[0], item[1]))]
+
+    def within_radius(self, point: Point, r: float) -> list[Point]:
+        # To samo przejście co dla prostokąta, ale obszarem zapytania jest koło
+        r_squared = r * r
+        nodes = self.traverse(
+            lambda node: node.rectangle.max_distance_squared(point) <= r_squared,
+            lambda node: node.rectangle.min_distance_squared(point) <= r_squared,
+        )
+        res = []
+        for node, _, whole in nodes:
+            if whole:  # cały obszar węzła leży w kole
+                res.extend(self.collect_points(node))
+            elif node.xs is not None:
+                mask = (node.xs - point.x) ** 2 + (node.ys - point.y) ** 2 <= r_squared
+                res.extend(node.points[mask].tolist())
+            else:
+                res.extend(p for p in node.points if p.distance_squared(point) <= r_squared)
+        return res
+
+    def find_many(self, rectangles) -> tuple[np.ndarray, np.ndarray]:
+        # Prostokąty jako tablica (m, 4): min_x, min_y, max_x, max_y (granice włącznie, jak w RectangleArea).
+        # Wynik w formacie CSR: punkty prostokąta i to points[offsets[i]:offsets[i + 1]].
+        # Quadtree można modyfikować, więc nie ma stałej numeracji punktów - zwracamy same punkty
+        rects = np.asarray(rectangles, dtype=np.float64).reshape(-1, 4)
+        m = len(rects)
+        hit_rects = []  # numery prostokątów
+        hit_points = []  # znalezione punkty (tablice obiektów)
+
+        # Przechodzimy drzewo raz dla całej paczki, niosąc zbiór aktywnych prostokątów
+        stack = [(self.root, np.arange(m))] if self.root is not None else []
+        while stack:
+            node, active = stack.pop()
+            r = rects[active]
+            min_x, min_y, max_x, max_y = node.rectangle.get_extrema()
+
+            # Odrzucamy prostokąty rozłączne z obszarem węzła
+            hit = (
+                (r[:, 0] <= max_x)
+                & (r[:, 2] >= min_x)
+                & (r[:, 1] <= max_y)
+                & (r[:, 3] >= min_y)
+            )
+            active = active[hit]
+            r = r[hit]
+            if len(active) == 0:
+                continue
+
+            # Prostokąty zawierające cały obszar węzła dostają całe poddrzewo
+            full = (
+                (r[:, 0] <= min_x)
+                & (r[:, 2] >= max_x)
+                & (r[:, 1] <= min_y)
+                & (r[:, 3] >= max_y)
+            )
+            if full.any():
+                points = self.collect_points(node)
+                values = np.empty(len(points), dtype=object)
+                values[:] = points
+                full_rects = active[full]
+                hit_rects.append(np.repeat(full_rects, len(values)))
+                hit_points.append(np.tile(values, len(full_rects)))
+                active = active[~full]
+                r = r[~full]
+                if len(active) == 0:
+                    continue
+
+            if node.is_leaf:
+                if node.xs is not None:
+                    xs, ys, values = node.xs, node.ys, to_object_array(node.points)
+                else:
+                    xs = np.array([p.x for p in node.points], dtype=np.float64)
+                    ys = np.array([p.y for p in node.points], dtype=np.float64)
+                    values = np.empty(len(node.points), dtype=object)
+                    values[:] = node.points
+
+                # Macierz (aktywne prostokąty) x (punkty liścia)
+                inside = (
+                    (r[:, 0, None] <= xs)
+                    & (xs <= r[:, 2, None])
+                    & (r[:, 1, None] <= ys)
+                    & (ys <= r[:, 3, None])
+                )
+                rect_index, point_index = np.nonzero(inside)
+                hit_rects.append(active[rect_index])
+                hit_points.append(values[point_index])
+                continue
+
+            for child in reversed(self.children(node)):
+                stack.append((child, active))
+
+        if hit_rects:
+            rect_ids = np.concatenate(hit_rects)
+            points = np.concatenate(hit_points)
         else:
-            # Rekurencyjnie sprawdzamy dzieci (cztery ćwiartki)
-            res.extend(self.find_recursion(node.lower_left, rectangle))
-            res.extend(self.find_recursion(node.lower_right, rectangle))
-            res.extend(self.find_recursion(node.upper_left, rectangle))
-            res.extend(self.find_recursion(node.upper_right, rectangle))
+            rect_ids = np.empty(0, dtype=np.intp)
+            points = np.empty(0, dtype=object)
+
+        order = np.argsort(rect_ids, kind="stable")
+        offsets = np.zeros(m + 1, dtype=np.intp)
+        np.cumsum(np.bincount(rect_ids, minlength=m), out=offsets[1:])
+        return offsets, points[order]
 
+    def count(self, rectangle: RectangleArea) -> int:
+        res = 0
+        for node, _, whole in self.traverse_rectangle(rectangle):
+            if whole:  # liczba punktów poddrzewa jest znana bez schodzenia
+                res += node.count
+            elif node.xs is not None:
+                res += int(np.count_nonzero(self.leaf_mask(node, rectangle)))
+            else:
+                res += sum(1 for p in node.points if rectangle.contains_point(p.x, p.y))
         return res
 
-    def find(self, rectangle: RectangleArea) -> list[Point]:
-        return self.find_recursion(self.root, rectangle)
+    def add_aggregate(self, name: str, fn) -> None:
+        # Rejestruje funkcję fn(punkt) pod nazwą i liczy jej sumy w poddrzewach (raz, O(n));
+        # potem insert/remove aktualizują je na ścieżce. Sumy liczymy przed wpisaniem
+        # do rejestru, więc równoległe aggregate nie trafi na węzły bez policzonej sumy
+        with self.aggregate_lock:
+            if name in self.aggregate_functions:
+                if self.aggregate_functions[name] is fn:
+                    return
+                raise ValueError(f"Aggregate {name!r} is already registered")
+            if self.root is not None:
+                self.compute_aggregates(self.root, {name: fn})
+            self.aggregate_functions = {**self.aggregate_functions, name: fn}
+
+    def remove_aggregate(self, name: str) -> None:
+        # Funkcja przestaje być liczona przy insert/remove
+        with self.aggregate_lock:
+            if name not in self.aggregate_functions:
+                raise ValueError(f"Unknown aggregate: {name!r}")
+            self.aggregate_functions = {
+                key: fn for key, fn in self.aggregate_functions.items() if key != name
+            }
+            stack = [self.root] if self.root is not None else []
+            while stack:
+                node = stack.pop()
+                node.aggregates.pop(name, None)
+                if not node.is_leaf:
+                    stack.extend(self.children(node))
+
+    def aggregate(self, rectangle: RectangleArea, name: str):
+        # Suma funkcji zarejestrowanej przez add_aggregate po punktach w prostokącie.
+        # Średnia to aggregate(rectangle, name) / count(rectangle)
+        fn = self.aggregate_functions.get(name)
+        if fn is None:
+            raise ValueError(f"Unknown aggregate: {name!r}")
+
+        res = 0
+        for node, _, whole in self.traverse_rectangle(rectangle):
+            if whole:
+                res += node.aggregates[name]
+            else:
+                res += sum(fn(p) for p in self.scan_leaf(node, rectangle))
+        return res
+
+    def save(self, path: str) -> None:
+        # Zapis drzewa jako płaskich tablic (format opisany w flat_tree)
+        save_tree(
+            path,
+            "quadtree",
+            self.root,
+            lambda node: [] if node.is_leaf else self.children(node),
+            lambda node: node.points,
+            lambda node: node.count,
+            None if self.ids is None else self.leaf_ids,
+        )
+
+    @staticmethod
+    def leaf_ids(node: QuadtreeNode) -> np.ndarray | None:
+        # Identyfikatory punktów liścia z from_arrays; liść zmieniony przez insert/remove ich nie ma
+        if isinstance(node.points, PointArray):
+            return node.points.ids
+        return None
+
+    def describe(self) -> dict:
+        # Statystyki budowy (tree_stats.describe_tree): rozkład głębokości liści, histogram
+        # zapełnienia liści, odsetek pustych ćwiartek i pamięć węzłów wewnętrznych i liści
+        return describe_tree(
+            self.root,
+            lambda node: [] if node.is_leaf else self.children(node),
+            lambda node: len(node.points),
+            [getattr(self, name, None) for name in ("xs", "ys", "points_array", "ids")],
+        )
 
-    def get_vis(self) -> None:
-        return self.vis
+    @staticmethod
+    def load(path: str) -> FlatTree:
+        # Tablice są mapowane z dysku bez budowania węzłów; wczytane drzewo jest
+        # tylko do odczytu i obsługuje find, find_positions i count
+        return FlatTree(path, "quadtree")
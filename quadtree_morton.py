@@ -0,0 +1,184 @@
+from __future__ import annotations
+import numpy as np
+from geo_structures import RectangleArea, Point
+
+K = 2
+MAX_BITS = 31  # dwie współrzędne po 31 bitów mieszczą się w kluczu uint64
+
+
+def interleave(cells: np.ndarray) -> np.ndarray:
+    # Rozsuwa bity liczby tak, że bit i trafia na pozycję 2i (klucz Mortona to x | y << 1)
+    v = cells.astype(np.uint64)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+class MortonQuadtree:
+    def __init__(self, xs, ys=None, bits: int = 16, max_points_per_node: int = 4):
+        # Liniowy quadtree: zamiast węzłów z dziećmi trzymamy punkty posortowane po kluczu
+        # Mortona (Z-order) w ciągłych tablicach. Każda ćwiartka na każdym poziomie to spójny
+        # przedział kluczy, więc węzeł to po prostu przedział tablicy znajdowany przez
+        # np.searchsorted. Przyjmujemy dwie tablice xs/ys albo jedną o kształcie (n, 2)
+        if ys is None:
+            coords = np.asarray(xs, dtype=np.float64).reshape(-1, K)
+        else:
+            coords = np.column_stack(
+                (np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+            )
+        if not 1 <= bits <= MAX_BITS:
+            raise ValueError(f"bits must be between 1 and {MAX_BITS}")
+
+        self.bits = bits
+        self.max_points_per_node = max(1, max_points_per_node)
+        self.size = len(coords)
+        if self.size == 0:
+            self.max_rectangle = None
+            self.indices = np.empty(0, dtype=np.intp)
+            self.keys = np.empty(0, dtype=np.uint64)
+            self.xs = np.empty(0, dtype=np.float64)
+            self.ys = np.empty(0, dtype=np.float64)
+            return
+
+        self.max_rectangle = RectangleArea(
+            float(coords[:, 0].min()),
+            float(coords[:, 1].min()),
+            float(coords[:, 0].max()),
+            float(coords[:, 1].max()),
+        )
+        # Siatka 2^bits x 2^bits komórek rozpięta na max_rectangle
+        cells = 1 << bits
+        width = self.max_rectangle.max_x - self.max_rectangle.min_x
+        height = self.max_rectangle.max_y - self.max_rectangle.min_y
+        self.scale = (
+            cells / width if width > 0 else 0.0,
+            cells / height if height > 0 else 0.0,
+        )
+
+        # Cała budowa to jedno sortowanie kluczy
+        keys = interleave(self.quantize(coords[:, 0], 0)) | (
+            interleave(self.quantize(coords[:, 1], 1)) << np.uint64(1)
+        )
+        self.indices = np.argsort(keys, kind="stable")  # permutacja punktów
+        self.keys = keys[self.indices]
+        self.xs = np.ascontiguousarray(coords[self.indices, 0])
+        self.ys = np.ascontiguousarray(coords[self.indices, 1])
+
+    def quantize(self, values: np.ndarray, axis: int) -> np.ndarray:
+        # Numer komórki siatki; funkcja jest niemalejąca, więc komórka ostro większa od komórki
+        # granicy prostokąta oznacza współrzędną ostro większą od tej granicy
+        origin = self.max_rectangle.min_x if axis == 0 else self.max_rectangle.min_y
+        cells = ((np.asarray(values, dtype=np.float64) - origin) * self.scale[axis]).astype(
+            np.int64
+        )
+        return np.minimum(cells, (1 << self.bits) - 1)
+
+    def visit(self, rectangle: RectangleArea) -> list[tuple[int, int, np.ndarray | None]]:
+        # Rozkłada prostokąt na przedziały kluczy. Zwraca (start, end, None) dla przedziałów
+        # leżących w całości w prostokącie i (start, end, pozycje) dla przedziałów sprawdzonych maską
+        res = []
+        if self.size == 0 or not rectangle.intersects(self.max_rectangle):
+            return res
+
+        min_x, min_y, max_x, max_y = rectangle.get_extrema()
+        # Granice prostokąta w komórkach. Gdy prostokąt wychodzi poza punkty z danej strony,
+        # ta strona niczego nie ogranicza i granica wypada poza siatką
+        low = [
+            -1 if bound <= origin else int(self.quantize(bound, axis))
+            for axis, (bound, origin) in enumerate(
+                ((min_x, self.max_rectangle.min_x), (min_y, self.max_rectangle.min_y))
+            )
+        ]
+        high = [
+            1 << self.bits if bound >= end else int(self.quantize(bound, axis))
+            for axis, (bound, end) in enumerate(
+                ((max_x, self.max_rectangle.max_x), (max_y, self.max_rectangle.max_y))
+            )
+        ]
+
+        # Węzeł: (pierwszy klucz, komórka lewego dolnego rogu, log2 boku, przedział tablicy)
+        stack = [(0, 0, 0, self.bits, 0, self.size)]
+        while stack:
+            key, cell_x, cell_y, level, lo, hi = stack.pop()
+            side = 1 << level
+            if (
+                cell_x + side - 1 < low[0]
+                or cell_x > high[0]
+                or cell_y + side - 1 < low[1]
+                or cell_y > high[1]
+            ):
+                continue  # komórki węzła leżą poza prostokątem
+
+            if (
+                low[0] < cell_x
+                and cell_x + side - 1 < high[0]
+                and low[1] < cell_y
+                and cell_y + side - 1 < high[1]
+            ):  # wszystkie komórki ostro wewnątrz - punkty na pewno leżą w prostokącie
+                res.append((lo, hi, None))
+                continue
+
+            if hi - lo <= self.max_points_per_node or level == 0:
+                xs = self.xs[lo:hi]
+                ys = self.ys[lo:hi]
+                mask = (xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y)
+                res.append((lo, hi, lo + np.flatnonzero(mask)))
+                continue
+
+            # Ćwiartki w kolejności kluczy: LD, PD, LG, PG - granice przedziałów jednym searchsorted
+            span = 1 << (2 * (level - 1))
+            half = side >> 1
+            bounds = [lo]
+            bounds.extend(
+                (
+                    lo
+                    + np.searchsorted(
+                        self.keys[lo:hi],
+                        np.array([key + span, key + 2 * span, key + 3 * span], dtype=np.uint64),
+                    )
+                ).tolist()
+            )
+            bounds.append(hi)
+            for q in reversed(range(4)):
+                if bounds[q] < bounds[q + 1]:
+                    stack.append(
+                        (
+                            key + q * span,
+                            cell_x + (q & 1) * half,
+                            cell_y + (q >> 1) * half,
+                            level - 1,
+                            bounds[q],
+                            bounds[q + 1],
+                        )
+                    )
+        return res
+
+    def find_positions(self, rectangle: RectangleArea) -> np.ndarray:
+        # Zwraca pozycje (w kolejności kluczy) punktów leżących w prostokącie
+        parts = [
+            np.arange(start, end, dtype=np.intp) if positions is None else positions
+            for start, end, positions in self.visit(rectangle)
+        ]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(parts)
+
+    def find_indices(self, rectangle: RectangleArea) -> np.ndarray:
+        # Indeksy punktów w oryginalnych tablicach xs/ys
+        return self.indices[self.find_positions(rectangle)]
+
+    def find(self, rectangle: RectangleArea) -> list[Point]:
+        positions = self.find_positions(rectangle)
+        return [
+            Point(x, y)
+            for x, y in zip(self.xs[positions].tolist(), self.ys[positions].tolist())
+        ]
+
+    def count(self, rectangle: RectangleArea) -> int:
+        return sum(
+            end - start if positions is None else len(positions)
+            for start, end, positions in self.visit(rectangle)
+        )
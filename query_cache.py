@@ -0,0 +1,106 @@
+from __future__ import annotations
+import math
+import threading
+from collections import OrderedDict
+import numpy as np
+from geo_structures import RectangleArea, BoxArea, Point
+from point_array import coordinates_of
+
+
+class QueryCache:
+    def __init__(
+        self,
+        tree,
+        resolution: float | None = None,
+        max_entries: int = 1024,
+        max_points: int = 1_000_000,
+    ):
+        # Pamięć podręczna wyników find przed KdTree, Quadtree albo DynamicKdTree.
+        # Bez resolution kluczem są dokładne granice prostokąta. Z resolution granice
+        # zaokrąglamy na zewnątrz do siatki o tym kroku: zapamiętujemy wynik dla powiększonego
+        # prostokąta, a przy trafieniu tylko filtrujemy go maską, więc nakładające się
+        # zapytania z tych samych komórek siatki korzystają z jednego wpisu
+        self.tree = tree
+        self.resolution = resolution
+        self.max_entries = max_entries
+        self.max_points = max_points  # łączna liczba punktów we wszystkich wpisach
+        self.entries = OrderedDict()  # klucz -> (punkty, ich współrzędne (n, K) lub None)
+        self.cached_points = 0
+        self.version = self.tree_version()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # chroni słownik, gdy find wołają różne wątki
+
+    def tree_version(self) -> int:
+        # Drzewa zmienne (Quadtree, DynamicKdTree) zwiększają version przy insert/remove,
+        # statyczne KdTree jej nie mają
+        return getattr(self.tree, "version", 0)
+
+    def key_of(self, rectangle: RectangleArea | BoxArea) -> tuple:
+        extrema = rectangle.get_extrema()
+        if self.resolution is None:
+            return extrema, rectangle
+
+        k = len(extrema) // 2
+        key = tuple(math.floor(v / self.resolution) for v in extrema[:k]) + tuple(
+            math.ceil(v / self.resolution) for v in extrema[k:]
+        )
+        bounds = [v * self.resolution for v in key]
+        if k == 2:
+            return key, RectangleArea(*bounds)
+        return key, BoxArea(bounds[:k], bounds[k:])
+
+    def find(self, rectangle: RectangleArea | BoxArea) -> list[Point]:
+        key, snapped = self.key_of(rectangle)
+        # Przez błąd zaokrąglenia granica siatki może minimalnie nie objąć prostokąta
+        if not snapped.contains_rect(rectangle):
+            with self.lock:
+                self.misses += 1
+            return self.tree.find(rectangle)
+
+        with self.lock:
+            version = self.tree_version()
+            if version != self.version:  # drzewo się zmieniło, wszystkie wpisy są nieaktualne
+                self.entries.clear()
+                self.cached_points = 0
+                self.version = version
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            points = self.tree.find(snapped)
+            coords = coordinates_of(points) if self.resolution is not None else None
+            entry = (points, coords)
+            self.store(key, entry, version)
+
+        points, coords = entry
+        if coords is None or not points or snapped == rectangle:
+            return list(points)
+
+        extrema = np.array(rectangle.get_extrema(), dtype=np.float64)
+        k = len(extrema) // 2
+        inside = ((coords >= extrema[:k]) & (coords <= extrema[k:])).all(axis=1)
+        return [points[i] for i in np.flatnonzero(inside).tolist()]
+
+    def store(self, key: tuple, entry: tuple, version: int) -> None:
+        size = len(entry[0])
+        if size > self.max_points:
+            return
+        with self.lock:
+            if version != self.version or key in self.entries:
+                return
+            self.entries[key] = entry
+            self.cached_points += size
+            # Usuwamy najdawniej używane wpisy, aż zmieścimy się w limitach
+            while len(self.entries) > self.max_entries or self.cached_points > self.max_points:
+                _, (points, _) = self.entries.popitem(last=False)
+                self.cached_points -= len(points)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.cached_points = 0
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import json
+import threading
+from collections import Counter
+from geo_structures import RectangleArea, Point
+from tree_observer import TreeObserver
+
+# Liczniki jednego zapytania find
+METRICS = (
+    "visited",  # węzły, do których weszło zapytanie
+    "pruned",  # węzły pominięte, bo ich obszar nie przecina prostokąta
+    "wholesale_subtrees",  # poddrzewa dodane do wyniku w całości (tylko KdTree)
+    "wholesale_points",  # punkty z tych poddrzew
+    "leaves_scanned",  # liście sprawdzone punkt po punkcie
+    "leaf_points_scanned",  # punkty w tych liściach
+    "leaf_points_found",  # punkty z tych liści leżące w prostokącie
+    "returned",  # rozmiar wyniku
+    "max_depth",  # największa głębokość odwiedzonego węzła
+)
+
+
+def bucket(value: int) -> int:
+    # Kubełki histogramu to potęgi dwójki: 0, 1, 2-3, 4-7, ... (klucz to dolna granica)
+    return 0 if value <= 0 else 1 << (value.bit_length() - 1)
+
+
+class QueryStats(TreeObserver):
+    # Statystyki zapytań find KdTree i Quadtree. Pojedyncze zapytanie:
+    #   stats = QueryStats(); tree.find(rectangle, stats=stats); stats.last
+    # Cały ruch: tree.attach(stats), a potem stats.to_dict() / stats.save(path) z sumami
+    # i histogramami każdej miary, np. do doboru max_points_per_node albo leaf_size.
+    # Liczniki bieżącego zapytania są osobne dla każdego wątku
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.queries = 0
+            self.totals = dict.fromkeys(METRICS, 0)
+            self.histograms = {metric: Counter() for metric in METRICS}
+
+    @property
+    def last(self) -> dict | None:
+        # Liczniki ostatniego zakończonego zapytania w tym wątku
+        return getattr(self.local, "last", None)
+
+    def query_started(self, tree, rectangle: RectangleArea) -> None:
+        self.local.current = dict.fromkeys(METRICS, 0)
+
+    def node_visited(self, node, depth: int) -> None:
+        current = self.local.current
+        current["visited"] += 1
+        if depth > current["max_depth"]:
+            current["max_depth"] = depth
+
+    def node_pruned(self, node, depth: int) -> None:
+        self.local.current["pruned"] += 1
+
+    def subtree_reported(self, node, depth: int, count: int) -> None:
+        current = self.local.current
+        current["wholesale_subtrees"] += 1
+        current["wholesale_points"] += count
+
+    def leaf_scanned(self, node, depth: int, scanned: int, found: int) -> None:
+        current = self.local.current
+        current["leaves_scanned"] += 1
+        current["leaf_points_scanned"] += scanned
+        current["leaf_points_found"] += found
+
+    def query_finished(self, tree, rectangle: RectangleArea, result: list[Point]) -> None:
+        current = self.local.current
+        current["returned"] = len(result)
+        self.local.last = current
+        with self.lock:
+            self.queries += 1
+            for metric, value in current.items():
+                self.totals[metric] += value
+                self.histograms[metric][bucket(value)] += 1
+
+    def summary(self) -> dict:
+        # Średnie na zapytanie oraz odsetek sprawdzonych punktów liści, które trafiły do wyniku
+        with self.lock:
+            queries = self.queries
+            totals = dict(self.totals)
+        res = {"queries": queries}
+        for metric, total in totals.items():
+            res[f"mean_{metric}"] = total / queries if queries else 0.0
+        scanned = totals["leaf_points_scanned"]
+        res["leaf_hit_ratio"] = totals["leaf_points_found"] / scanned if scanned else 0.0
+        return res
+
+    def to_dict(self) -> dict:
+        summary = self.summary()
+        with self.lock:
+            histograms = {
+                metric: {str(b): n for b, n in sorted(counts.items())}
+                for metric, counts in self.histograms.items()
+            }
+            totals = dict(self.totals)
+        return {"summary": summary, "totals": totals, "histograms": histograms}
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLOTTING_MODULES = ["matplotlib", "IPython"]
+CORE_MODULES = ["geo_structures", "get_median", "kd_tree", "quadtree"]
+IMPORT_BUDGET = 2.0  # sekundy; z dużym zapasem, bo sam numpy ładuje się około 0.1 s
+
+# Import w nowym interpreterze, żeby nic nie było wcześniej załadowane
+# (ten sam pomiar co benchmark.IMPORT_SCRIPT)
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, sorted(m for m in sys.modules if m.split(".")[0] in {forbidden})]))
+"""
+
+
+def cold_import(module: str, forbidden: list[str]) -> tuple[float, list[str]]:
+    # Czas zimnego importu w sekundach i załadowane moduły z listy forbidden
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(module=module, forbidden=forbidden)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, loaded = json.loads(out.stdout)
+    print(f"import {module}: {elapsed * 1e3:.1f} ms")  # widoczne w pytest -s
+    return elapsed, loaded
+
+
+def test_core_modules_import_fast_without_plotting():
+    for module in CORE_MODULES:
+        elapsed, loaded = cold_import(module, PLOTTING_MODULES + ["visualizer"])
+        assert loaded == [], f"import {module} loads {loaded}"
+        assert elapsed < IMPORT_BUDGET, f"import {module} took {elapsed:.3f} s"
+
+
+def test_visualizer_loads_matplotlib_only_when_drawing():
+    elapsed, loaded = cold_import("visualizer.main", PLOTTING_MODULES)
+    assert loaded == [], f"import visualizer.main loads {loaded}"
+    assert elapsed < IMPORT_BUDGET, f"import visualizer.main took {elapsed:.3f} s"
@@ -0,0 +1,129 @@
+from __future__ import annotations
+import time
+from geo_structures import RectangleArea, Point
+
+
+# Obserwator zdarzeń KdTree i Quadtree, podpinany przez tree.attach(observer).
+# Drzewo bez obserwatora nie woła żadnej z tych metod: find sprawdza tylko, czy
+# observer jest ustawiony, a podziały węzłów są odtwarzane dopiero przy attach,
+# więc budowa i zapytania działają tak samo szybko jak bez tej funkcji.
+# Własny obserwator dziedziczy po TreeObserver i nadpisuje potrzebne metody
+class TreeObserver:
+    def tree_built(self, tree, points: list[Point]) -> None:
+        # Drzewo jest gotowe; zaraz po tym przychodzą jego podziały w kolejności preorder
+        pass
+
+    def node_split(self, node, children: list, depth: int) -> None:
+        # Węzeł został podzielony na dzieci (przy budowie, a w Quadtree także przy insert)
+        pass
+
+    def query_started(self, tree, rectangle: RectangleArea) -> None:
+        pass
+
+    def node_visited(self, node, depth: int) -> None:
+        # find wszedł do węzła, którego obszar przecina szukany prostokąt
+        pass
+
+    def node_pruned(self, node, depth: int) -> None:
+        # find pominął węzeł (razem z poddrzewem), bo jego obszar nie przecina prostokąta
+        pass
+
+    def subtree_reported(self, node, depth: int, count: int) -> None:
+        # Obszar węzła leży w całości w prostokącie, więc count punktów poddrzewa trafia
+        # do wyniku bez sprawdzania
+        pass
+
+    def leaf_scanned(self, node, depth: int, scanned: int, found: int) -> None:
+        # Sprawdzono scanned punktów liścia, z czego found leży w prostokącie
+        pass
+
+    def point_reported(self, point: Point) -> None:
+        pass
+
+    def query_finished(self, tree, rectangle: RectangleArea, result: list[Point]) -> None:
+        pass
+
+
+class ProfilerObserver(TreeObserver):
+    # Liczniki zdarzeń ze wszystkich zapytań. Czas zapytań obejmuje wywołania obserwatora,
+    # więc służy do porównań między zapytaniami, a nie do pomiaru samego find
+    def __init__(self):
+        self.splits = 0
+        self.queries = 0
+        self.visited = 0
+        self.pruned = 0
+        self.reported = 0
+        self.max_depth = 0
+        self.query_time = 0.0
+        self.started = 0.0
+
+    def node_split(self, node, children: list, depth: int) -> None:
+        self.splits += 1
+
+    def query_started(self, tree, rectangle: RectangleArea) -> None:
+        self.queries += 1
+        self.started = time.perf_counter()
+
+    def node_visited(self, node, depth: int) -> None:
+        self.visited += 1
+        self.max_depth = max(self.max_depth, depth)
+
+    def node_pruned(self, node, depth: int) -> None:
+        self.pruned += 1
+
+    def point_reported(self, point: Point) -> None:
+        self.reported += 1
+
+    def query_finished(self, tree, rectangle: RectangleArea, result: list[Point]) -> None:
+        self.query_time += time.perf_counter() - self.started
+
+    def summary(self) -> dict:
+        return {
+            "splits": self.splits,
+            "queries": self.queries,
+            "visited": self.visited,
+            "pruned": self.pruned,
+            "reported": self.reported,
+            "max_depth": self.max_depth,
+            "query_time": self.query_time,
+        }
+
+
+def rectangle_polygon(rectangle: RectangleArea) -> list[tuple[float, float]]:
+    return [
+        (rectangle.min_x, rectangle.min_y),
+        (rectangle.max_x, rectangle.min_y),
+        (rectangle.max_x, rectangle.max_y),
+        (rectangle.min_x, rectangle.max_y),
+    ]
+
+
+class VisualizerObserver(TreeObserver):
+    # Rysuje budowę i zapytania drzew dwuwymiarowych: punkty na pomarańczowo, obszary
+    # dzieci każdego podziału na czarno, a zapytanie i znalezione punkty na fioletowo.
+    # Visualizer (i matplotlib) ładujemy dopiero tutaj, nie w modułach drzew
+    def __init__(self, vis=None):
+        if vis is None:
+            from visualizer.main import Visualizer
+
+            vis = Visualizer()
+        self.vis = vis
+
+    def tree_built(self, tree, points: list[Point]) -> None:
+        for point in points:
+            self.vis.add_point((point.x, point.y), color="orange", s=15)
+        if tree.max_rectangle is not None:
+            self.vis.add_polygon(rectangle_polygon(tree.max_rectangle), color="black", fill=False)
+
+    def node_split(self, node, children: list, depth: int) -> None:
+        for child in children:
+            self.vis.add_polygon(rectangle_polygon(child.rectangle), color="black", fill=False)
+
+    def query_started(self, tree, rectangle: RectangleArea) -> None:
+        self.vis.add_polygon(rectangle_polygon(rectangle), color="purple", alpha=0.2)
+
+    def point_reported(self, point: Point) -> None:
+        self.vis.add_point((point.x, point.y), color="purple", s=13)
+
+    def get_vis(self):
+        return self.vis
@@ -0,0 +1,72 @@
+from __future__ import annotations
+import sys
+from collections import Counter
+import numpy as np
+
+
+def node_bytes(node) -> int:
+    # Przybliżony rozmiar węzła: obiekt, słownik atrybutów i to, na co wskazują atrybuty
+    # (prostokąt, listy, słowniki, nagłówki wycinków tablic), bez dzieci i samych punktów
+    size = sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+    for value in vars(node).values():
+        if value is not None and type(value) is not type(node):
+            size += sys.getsizeof(value)
+    return size
+
+
+def container_bytes(value) -> int:
+    # Dane tablicy numpy albo sama lista referencji
+    if value is None:
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+def describe_tree(root, children_of, count_of, containers=()) -> dict:
+    # Statystyki zbudowanego drzewa. children_of(węzeł) zwraca listę dzieci (pustą dla liścia),
+    # count_of(węzeł) liczbę punktów liścia, a containers to tablice i listy całego drzewa
+    leaf_depths = Counter()  # głębokość -> liczba liści
+    occupancy = Counter()  # liczba punktów -> liczba liści
+    memory = {
+        kind: {"count": 0, "bytes": 0, "mean_bytes": 0.0} for kind in ("internal", "leaf")
+    }
+    height = 0
+
+    stack = [(root, 0)] if root is not None else []
+    while stack:
+        node, depth = stack.pop()
+        height = max(height, depth)
+        children = children_of(node)
+        kind = memory["internal" if children else "leaf"]
+        kind["count"] += 1
+        kind["bytes"] += node_bytes(node)
+        if children:
+            stack.extend((child, depth + 1) for child in children)
+        else:
+            leaf_depths[depth] += 1
+            occupancy[count_of(node)] += 1
+
+    for kind in memory.values():
+        kind["mean_bytes"] = kind["bytes"] / kind["count"] if kind["count"] else 0.0
+    memory["node_type"] = type(root).__name__ if root is not None else None
+    memory["containers"] = sum(container_bytes(c) for c in containers)
+    memory["total"] = memory["internal"]["bytes"] + memory["leaf"]["bytes"] + memory["containers"]
+
+    leaves = sum(leaf_depths.values())
+    points = sum(count * n for count, n in occupancy.items())
+    return {
+        "nodes": memory["internal"]["count"] + leaves,
+        "leaves": leaves,
+        "points": points,
+        "height": height,
+        "leaf_depths": dict(sorted(leaf_depths.items())),
+        "mean_leaf_depth": (
+            sum(depth * n for depth, n in leaf_depths.items()) / leaves if leaves else 0.0
+        ),
+        "leaf_occupancy": dict(sorted(occupancy.items())),
+        "mean_leaf_occupancy": points / leaves if leaves else 0.0,
+        "empty_leaves": occupancy[0],
+        "empty_leaf_ratio": occupancy[0] / leaves if leaves else 0.0,
+        "memory": memory,
+    }
@@ -1,6 +1,5 @@
 from .figure import Figure
 import numpy as np
-from matplotlib.patches import Circle as Circl
 
 
 class Circle(Figure):
@@ -9,6 +8,8 @@ class Circle(Figure):
         super().__init__(data, options)
 
     def draw(self, ax):
+        from matplotlib.patches import Circle as Circl
+
         artist = []
         for circle in self.data:
             c = Circl(circle[:2], radius=circle[2], **self.options)
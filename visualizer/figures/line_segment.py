@@ -1,5 +1,4 @@
 from .figure import Figure
-from matplotlib.collections import LineCollection
 import numpy as np
 
 
@@ -9,6 +8,8 @@ class LineSegment(Figure):
         super().__init__(data, options)
 
     def draw(self, ax):
+        from matplotlib.collections import LineCollection
+
         line_collection = LineCollection(self.data, **self.options)
         artist = [ax.add_collection(line_collection)]
         return artist
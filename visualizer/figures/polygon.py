@@ -1,6 +1,5 @@
 from .figure import Figure
 import numpy as np
-from matplotlib.patches import Polygon as Polygo
 
 
 class Polygon(Figure):
@@ -19,6 +18,8 @@ class Polygon(Figure):
         super().__init__(data, options)
 
     def draw(self, ax):
+        from matplotlib.patches import Polygon as Polygo
+
         artist = []
         for polygon in self.data:
             p = Polygo(polygon, **self.options)
@@ -4,7 +4,6 @@ from .figures.circle import Circle
 from .figures.polygon import Polygon
 from .figures.line import Line
 from .figures.half_line import HalfLine
-from .plot.plot import Plot
 
 class Visualizer:
     def __init__(self):
@@ -59,14 +58,22 @@ class Visualizer:
         self.plot_data = {}
 
     def show(self):
+        from .plot.plot import Plot  # matplotlib ładujemy dopiero przy rysowaniu
+
         Plot.show(self.plot_data, self.data)
 
     def save(self, filename='plot'):
+        from .plot.plot import Plot
+
         Plot.save(self.plot_data, self.data, filename)
 
     def show_gif(self, interval=256):
+        from .plot.plot import Plot
+
         gif = Plot.show_gif(self.plot_data, self.data, interval)
         return gif
 
     def save_gif(self, filename='animation', interval=256):
+        from .plot.plot import Plot
+
         Plot.save_gif(self.plot_data, self.data, interval, filename)